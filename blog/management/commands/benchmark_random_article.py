@@ -0,0 +1,54 @@
+# File: benchmark_random_article.py
+# Author: A'Yanna Rouse (yanni620@bu.edu), 10/18/2026
+# Description: Management command to time random article selection against a large, temporary set of articles.
+
+import random
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Article
+
+
+class Command(BaseCommand):
+    help = ('Time Article.get_random() against choosing from every article, on a temporary table of '
+            'generated articles. Nothing is left in the database.')
+
+    def add_arguments(self, parser):
+        ''' Define the command line arguments.'''
+        parser.add_argument('--articles', type=int, default=100000, help='number of articles to generate (default: 100000)')
+        parser.add_argument('--picks', type=int, default=200, help='number of random picks to time (default: 200)')
+
+    def handle(self, *args, **options):
+        ''' Generate the articles, time both ways of picking one, then roll everything back.'''
+        with transaction.atomic():
+            user = User.objects.create(username='benchmark_random_article')
+            body = 'lorem ipsum ' * 200
+            Article.objects.bulk_create(
+                (Article(title=f'Article {i}', author='Benchmark', text=body, user=user) for i in range(options['articles'])),
+                batch_size=2000,
+            )
+            # delete one article in ten, so the pk range has gaps to retry on
+            pks = list(Article.objects.filter(user=user).values_list('pk', flat=True))
+            Article.objects.filter(pk__in=pks[::10]).delete()
+            self.stdout.write(f'Generated {Article.objects.count()} articles.')
+
+            self.time('random.choice(Article.objects.all())', lambda: random.choice(Article.objects.all()), 3)
+            self.time('Article.get_random()', Article.get_random, options['picks'])
+
+            transaction.set_rollback(True)
+
+    def time(self, label, pick, picks):
+        ''' Report the mean time and the peak memory of picking an article.'''
+        tracemalloc.start()
+        started = time.perf_counter()
+        for _ in range(picks):
+            pick()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(f'{label}: {1000 * elapsed / picks:.2f} ms per pick, peak {peak / 1024 / 1024:.1f} MB '
+                          f'({picks} picks).')
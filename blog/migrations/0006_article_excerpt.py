@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:19
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def fill_excerpts(apps, schema_editor):
+    ''' Store the excerpt of every existing article.'''
+    Article = apps.get_model('blog', 'Article')
+    articles = []
+    for article in Article.objects.only('text').iterator(chunk_size=1000):
+        article.excerpt = Truncator(' '.join(article.text.split())).chars(200)
+        articles.append(article)
+    Article.objects.bulk_update(articles, ['excerpt'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_article_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='published',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_comments(apps, schema_editor):
+    ''' Store the number of comments on every existing article.'''
+    Article = apps.get_model('blog', 'Article')
+    Comment = apps.get_model('blog', 'Comment')
+    for article_id, count in Comment.objects.values_list('article').annotate(count=Count('pk')).order_by():
+        Article.objects.filter(pk=article_id).update(comment_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_article_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', 'published', 'id'], name='comment_article_published_idx'),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,23 @@ from email.mime import image
 from django.db import models
 from django.urls import reverse
 from django.contrib.auth.models import User # for user authentication
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from cs412.caching import clear_cached_pages
+from django.db.models import F, Max, Min
+from django.utils.text import Truncator
+import random
+
+# how many random pks to try before taking the next article after one
+RANDOM_ARTICLE_TRIES = 5
+
+# length of the excerpt shown for each article in the listing
+EXCERPT_LENGTH = 200
+
+def make_excerpt(text):
+    ''' Return the start of an article's text, on one line and ended with an ellipsis if it is longer.'''
+    return Truncator(' '.join(text.split())).chars(EXCERPT_LENGTH)
+
 
 # Create your models here.
 class Article(models.Model):
@@ -11,7 +28,11 @@ class Article(models.Model):
     title = models.TextField(blank=True)
     author = models.TextField(blank=True)
     text = models.TextField(blank=True)
-    published = models.DateTimeField(auto_now=True)
+    # the start of text, kept up to date by save() so the listing never reads text
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False)
+    published = models.DateTimeField(auto_now=True, db_index=True)
+    # number of comments, kept up to date by the Comment receivers below
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
     # image_url = models.URLField(blank=True) # url as a string
     image_file = models.ImageField(blank=True) # file upload
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -19,14 +40,43 @@ class Article(models.Model):
     def __str__(self):
         ''' Return a string representation of this model instance.'''
         return f'{self.title} by {self.author}'
+
+    def save(self, *args, **kwargs):
+        ''' Refresh the excerpt from the text before saving.'''
+        # an article loaded without its text (as the listing does) keeps the excerpt it has
+        if 'text' not in self.get_deferred_fields():
+            self.excerpt = make_excerpt(self.text)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'text' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
     
     def get_absolute_url(self):
         ''' Return a URL to display one instance of this object.'''
         return reverse('article', kwargs={'pk': self.pk})
+
+    @classmethod
+    def get_random(cls):
+        ''' Return an article chosen at random, or None if there are none.
+        Only the primary key index is read, so the cost does not grow with the table.
+        '''
+        bounds = cls.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            return None
+
+        # pick pks in the range until one exists; each miss is a deleted article
+        for _ in range(RANDOM_ARTICLE_TRIES):
+            article = cls.objects.filter(pk=random.randint(bounds['low'], bounds['high'])).first()
+            if article is not None:
+                return article
+
+        # a table with many gaps: settle for the first article after a random pk
+        pk = random.randint(bounds['low'], bounds['high'])
+        return cls.objects.filter(pk__gte=pk).order_by('pk').first()
     
     def get_all_comments(self):
-        ''' Return all comments for this article.'''
-        comments = Comment.objects.filter(article=self)
+        ''' Return all comments for this article, oldest first.'''
+        comments = Comment.objects.filter(article=self).order_by('published', 'pk')
         return comments
     
 class Comment(models.Model):
@@ -38,6 +88,32 @@ class Comment(models.Model):
     text = models.TextField(blank=False)
     published = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # an article's comments in the order they are shown
+            models.Index(fields=['article', 'published', 'id'], name='comment_article_published_idx'),
+        ]
+
     def __str__(self):
         ''' Return a string representation of this Comment.'''
-        return f'{self.text}'
\ No newline at end of file
+        return f'{self.text}'
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    ''' Add a new comment to its article's comment count, however it was saved.'''
+    if created and not raw:
+        Article.objects.filter(pk=instance.article_id).update(comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_deleted_comment(sender, instance, **kwargs):
+    ''' Take a deleted comment off its article's comment count, which never goes below zero.'''
+    Article.objects.filter(pk=instance.article_id, comment_count__gt=0).update(comment_count=F('comment_count') - 1)
+
+
+@receiver([post_save, post_delete], sender=Article)
+@receiver([post_save, post_delete], sender=Comment)
+def clear_blog_pages(sender, **kwargs):
+    ''' Drop the cached blog pages once an article or comment changes.'''
+    clear_cached_pages('blog')
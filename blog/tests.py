@@ -1,3 +1,276 @@
-from django.test import TestCase
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from cs412.caching import page_cache_key
+from marathon_analytics.views import ResultsListView
+
+from .models import EXCERPT_LENGTH, Article, Comment
+from .views import COMMENTS_PER_PAGE
+
+
+def make_article(user, title):
+    ''' Create an article for the tests.'''
+    return Article.objects.create(title=title, author='Author', text='Text', user=user)
+
 
 # Create your tests here.
+class RandomArticleTests(TestCase):
+    ''' Picking a random article must not load the whole table.'''
+
+    def setUp(self):
+        # pages cached by earlier tests would hide these tests' rows
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+
+    def test_no_articles_is_404(self):
+        self.assertIsNone(Article.get_random())
+        self.assertEqual(self.client.get(reverse('random')).status_code, 404)
+
+    def test_shows_an_article(self):
+        article = make_article(self.user, 'Only one')
+        response = self.client.get(reverse('random'))
+        self.assertEqual(response.context['article'], article)
+
+    def test_query_count_does_not_grow(self):
+        Article.objects.bulk_create(Article(title=f'Article {i}', user=self.user) for i in range(200))
+        # the range lookup and one hit, however many articles there are
+        for _ in range(10):
+            with self.assertNumQueries(2):
+                self.assertIsNotNone(Article.get_random())
+
+    def test_skips_deleted_articles(self):
+        articles = [make_article(self.user, f'Article {i}') for i in range(10)]
+        Article.objects.filter(pk__in=[a.pk for a in articles[1:-1]]).delete()
+        kept = {articles[0], articles[-1]}
+        for _ in range(20):
+            self.assertIn(Article.get_random(), kept)
+
+    def test_falls_back_after_misses(self):
+        first = make_article(self.user, 'First')
+        last = make_article(self.user, 'Last')
+        Article.objects.filter(pk=last.pk).update(id=first.pk + 1000)
+        # every try lands in the gap, then the next article after a pk is taken
+        with mock.patch('blog.models.random.randint', return_value=first.pk + 500):
+            self.assertEqual(Article.get_random().pk, first.pk + 1000)
+
+
+class ShowAllTests(TestCase):
+    ''' The article listing reads a page of excerpts, never the full text.'''
+
+    def setUp(self):
+        # pages cached by earlier tests would hide these tests' rows
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+
+    def test_excerpt_follows_text(self):
+        article = make_article(self.user, 'Long')
+        article.text = 'word ' * 100
+        article.save()
+        self.assertEqual(len(article.excerpt), EXCERPT_LENGTH)
+        self.assertTrue(article.excerpt.endswith('…'))
+        article.text = 'Short and\nsweet'
+        article.save(update_fields=['text'])
+        article.refresh_from_db()
+        self.assertEqual(article.excerpt, 'Short and sweet')
+
+    def test_listing_leaves_text_unread(self):
+        make_article(self.user, 'One')
+        response = self.client.get(reverse('show_all'))
+        articles = list(response.context['articles'])
+        self.assertEqual(len(articles), 1)
+        self.assertIn('text', articles[0].get_deferred_fields())
+        self.assertContains(response, articles[0].excerpt)
+
+    def test_pages_newest_first(self):
+        Article.objects.bulk_create(Article(title=f'Article {i}', user=self.user) for i in range(45))
+        newest_first = list(Article.objects.order_by('-published', '-pk').values_list('pk', flat=True))
+
+        seen = []
+        query = ''
+        while True:
+            # every page costs the same, however far back it is
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse('show_all') + query)
+            seen += [article.pk for article in response.context['articles']]
+            page = response.context['page_obj']
+            if not page.has_next():
+                break
+            query = '?' + page.next_query
+        self.assertEqual(seen, newest_first)
+
+    def test_cursor_from_another_view_shows_first_page(self):
+        make_article(self.user, 'Only')
+        # a results page cursor is keyed on (place_overall, pk), which published cannot take
+        cursor = {'dir': 'next', 'key': [12, 34], 'page': 2}
+        for salt in [ResultsListView().get_cursor_salt(), self.client.get(reverse('show_all')).context['view'].cursor_salt]:
+            response = self.client.get(reverse('show_all'), {'cursor': signing.dumps(cursor, salt=salt)})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['page_obj'].number, 1)
+            self.assertEqual(len(response.context['articles']), 1)
+
+    def test_unusable_key_shows_first_page(self):
+        make_article(self.user, 'Only')
+        view = self.client.get(reverse('show_all')).context['view']
+        token = signing.dumps({'dir': 'next', 'key': [12, 34], 'page': 2}, salt=view.get_cursor_salt())
+        response = self.client.get(reverse('show_all'), {'cursor': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+
+class CommentTests(TestCase):
+    ''' Comments are shown a page at a time and counted on their article.'''
+
+    def setUp(self):
+        # pages cached by earlier tests would hide these tests' rows
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+        self.article = make_article(self.user, 'Popular')
+
+    def test_create_and_delete_keep_count(self):
+        url = reverse('create_comment', kwargs={'pk': self.article.pk})
+        self.client.post(url, {'author': 'Reader', 'text': 'First'})
+        self.client.post(url, {'author': 'Reader', 'text': 'Second'})
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.comment_count, 2)
+
+        comment = Comment.objects.filter(article=self.article).first()
+        response = self.client.post(reverse('delete_comment', kwargs={'pk': comment.pk}))
+        self.assertRedirects(response, reverse('article', kwargs={'pk': self.article.pk}))
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.comment_count, 1)
+
+    def test_count_follows_comments_saved_outside_the_views(self):
+        first = Comment.objects.create(article=self.article, author='Reader', text='First')
+        Comment.objects.create(article=self.article, author='Reader', text='Second')
+        first.text = 'Edited'
+        first.save()
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.comment_count, 2)
+
+        first.delete()
+        Comment.objects.filter(article=self.article).delete()
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.comment_count, 0)
+
+    def test_count_never_goes_below_zero(self):
+        comment = Comment.objects.create(article=self.article, author='Reader', text='First')
+        Article.objects.filter(pk=self.article.pk).update(comment_count=0)
+        comment.delete()
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.comment_count, 0)
+
+    def test_comments_are_paged_oldest_first(self):
+        Comment.objects.bulk_create(Comment(article=self.article, author='Reader', text=f'Comment {i}')
+                                    for i in range(COMMENTS_PER_PAGE + 5))
+        oldest_first = list(self.article.get_all_comments().values_list('pk', flat=True))
+
+        # the page version, the article and one page of comments, however many there are
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('article', kwargs={'pk': self.article.pk}))
+        page = response.context['comments_page']
+        self.assertEqual([c.pk for c in response.context['comments']], oldest_first[:COMMENTS_PER_PAGE])
+        self.assertTrue(page.has_next())
+
+        response = self.client.get(reverse('article', kwargs={'pk': self.article.pk}) + '?' + page.next_query)
+        self.assertEqual([c.pk for c in response.context['comments']], oldest_first[COMMENTS_PER_PAGE:])
+
+    def test_listing_shows_counts_without_extra_queries(self):
+        Article.objects.filter(pk=self.article.pk).update(comment_count=3)
+        for i in range(5):
+            make_article(self.user, f'Article {i}')
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('show_all'))
+        self.assertContains(response, '3 comments')
+
+
+class PageCacheTests(TestCase):
+    ''' Anonymous visitors are served cached pages until the articles or comments change.'''
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+        self.article = make_article(self.user, 'Cached')
+        self.url = reverse('article', kwargs={'pk': self.article.pk})
+
+    def test_anonymous_page_is_cached(self):
+        first = self.client.get(self.url)
+        self.assertIn('Cookie', first['Vary'])
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+
+    def test_comment_clears_cached_pages(self):
+        self.client.get(self.url)
+        self.client.get(reverse('show_all'))
+        self.client.post(reverse('create_comment', kwargs={'pk': self.article.pk}), {'author': 'Reader', 'text': 'Fresh'})
+        self.assertContains(self.client.get(self.url), 'Fresh')
+        self.assertContains(self.client.get(reverse('show_all')), '1 comment')
+
+    def test_logged_in_page_is_not_cached(self):
+        self.client.get(self.url)
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Logged in as: writer')
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_other_apps_pages_are_cached(self):
+        for url, group in [('/quotes/show_all', 'quotes'), ('/restaurant/main', 'restaurant')]:
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertIsNotNone(cache.get(page_cache_key(RequestFactory().get(url), group)), url)
+
+    def test_pages_with_the_time_are_not_cached(self):
+        # the hw about page shows the current time and random letters on every view
+        self.assertEqual(self.client.get('/hw/about').status_code, 200)
+        self.assertIsNone(cache.get(page_cache_key(RequestFactory().get('/hw/about'), 'hw')))
+
+
+class ConditionalGetTests(TestCase):
+    ''' A visitor revisiting an unchanged article gets 304 Not Modified.'''
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+        self.article = make_article(self.user, 'Fresh')
+        self.url = reverse('article', kwargs={'pk': self.article.pk})
+
+    def test_unchanged_article_is_not_modified(self):
+        first = self.client.get(self.url)
+        self.assertIn('Last-Modified', first)
+
+        # served from the page cache without a query
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        # and, for a logged-in visitor, from the one freshness query
+        self.client.force_login(self.user)
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(etag, first['ETag'])
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_comments_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        comment = Comment.objects.create(article=self.article, author='Reader', text='Hi')
+        Article.objects.filter(pk=self.article.pk).update(comment_count=1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.client.post(reverse('delete_comment', kwargs={'pk': comment.pk}))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_random_article_is_always_sent(self):
+        response = self.client.get(reverse('random'))
+        self.assertNotIn('ETag', response)
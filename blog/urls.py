@@ -5,12 +5,13 @@ from .views import * #ShowAllView, ArticleView, RandomArticleView
 
 # generic wiew for authentication/authorization
 from django.contrib.auth import views as auth_views
+from cs412.caching import cache_anonymous_page
 
 urlpatterns = [
     path('', RandomArticleView.as_view(), name="random"),
-    path('show_all', ShowAllView.as_view(), name="show_all"),
+    path('show_all', cache_anonymous_page(SHOW_ALL_CACHE_TIMEOUT, 'blog')(ShowAllView.as_view()), name="show_all"),
     path('article/create', CreateArticleView.as_view(), name="create_article"),
-    path('article/<int:pk>', ArticleView.as_view(), name='article'),
+    path('article/<int:pk>', cache_anonymous_page(ARTICLE_CACHE_TIMEOUT, 'blog')(ArticleView.as_view()), name='article'),
     path('article/<int:pk>/create_comment', CreateCommentView.as_view(), name="create_comment"),
     path('article/<int:pk>/update', UpdateArticleView.as_view(), name="update_article"),
     path('comment/<int:pk>/delete', DeleteCommentView.as_view(), name="delete_comment"),
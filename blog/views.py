@@ -1,5 +1,5 @@
-import random
 from django.shortcuts import render
+from django.http import Http404
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from .models import Article, Comment
 from .forms import CreateArticleForm, CreateCommentForm, UpdateArticleForm
@@ -7,42 +7,82 @@ from django.urls import reverse
 from django.contrib.auth.mixins import LoginRequiredMixin # for authorization
 from django.contrib.auth.forms import UserCreationForm # for new user
 from django.contrib.auth.models import User # the Django user model
+from django.db.models import OuterRef, Subquery
+from cs412.caching import ConditionalGetMixin
+from cs412.pagination import KeysetPaginationMixin
+import logging
+
+logger = logging.getLogger(__name__)
+
+# number of comments shown on each page of an article
+COMMENTS_PER_PAGE = 20
+
+# seconds anonymous visitors may be shown a cached page; edits clear them sooner
+SHOW_ALL_CACHE_TIMEOUT = 60 * 5
+ARTICLE_CACHE_TIMEOUT = 60 * 15
 
 
 # Create your views here.
-class ShowAllView(ListView):
-    ''' Define a view class to show all blog articles. '''
+class ShowAllView(KeysetPaginationMixin, ListView):
+    ''' Define a view class to show all blog articles, newest first, a page at a time. '''
     model = Article
     template_name = "blog/show_all.html"
     context_object_name = "articles"
+    paginate_by = 20
+    keyset_fields = ('-published', '-pk')
+
+    def get_queryset(self):
+        ''' Return the articles with only the columns the listing shows; the full text is left unread. '''
+        return Article.objects.only('title', 'author', 'excerpt', 'published', 'image_file', 'comment_count')
 
     def dispatch(self, request, *args, **kwargs):
         '''Override the dispatch method to add debugging information.'''
-
-        if request.user.is_authenticated:
-            print(f'ShowAllView.dispatch(): request.user={request.user}')
-        else:
-            print(f'ShowAllView.dispatch(): not logged in.')
-
+        logger.debug('ShowAllView.dispatch(): user=%s', request.user)
         return super().dispatch(request, *args, **kwargs)
 
-class ArticleView(DetailView):
-    ''' Display a single article. '''
+class ArticleView(ConditionalGetMixin, KeysetPaginationMixin, DetailView):
+    ''' Display a single article, with a page of its comments. '''
     model = Article
     template_name = "blog/article.html"
     context_object_name = "article" # note singular variable name
+    keyset_fields = ('published', 'pk')
+
+    def get_freshness(self):
+        ''' Return the version and last change of the article page, from the article row and
+        its newest comment in one query. The comment count also catches deleted comments.
+        '''
+        # the newest comment is read off the end of the (article, published) index
+        newest_comment = Comment.objects.filter(article=OuterRef('pk')).order_by('-published').values('published')[:1]
+        row = (Article.objects.filter(pk=self.kwargs['pk'])
+               .annotate(last_comment=Subquery(newest_comment))
+               .values_list('published', 'comment_count', 'last_comment')
+               .first())
+        if row is None:
+            return None
+        published, comment_count, last_comment = row
+        last_modified = max(published, last_comment) if last_comment else published
+        return f'{published.isoformat()}:{comment_count}:{last_modified.isoformat()}', last_modified
+
+    def get_context_data(self, **kwargs):
+        ''' Add the page of comments named by the cursor, oldest first, to the context. '''
+        context = super().get_context_data(**kwargs)
+        _, page, comments, _ = self.paginate_queryset(Comment.objects.filter(article=self.object), COMMENTS_PER_PAGE)
+        context['comments'] = comments
+        context['comments_page'] = page
+        return context
 
-class RandomArticleView(DetailView):
+class RandomArticleView(ArticleView):
     ''' Display a single article selected at random.'''
 
-    model = Article
-    template_name = "blog/article.html"
-    context_object_name = "article" # note singular variable name
+    def get_freshness(self):
+        ''' Always render the page: each visit shows a different article.'''
+        return None
 
     def get_object(self):
         ''' Return one instance of the Article model selected at random.'''
-        all_articles = Article.objects.all()
-        article = random.choice(all_articles)
+        article = Article.get_random()
+        if article is None:
+            raise Http404('There are no articles yet.')
         return article
     
 class CreateArticleView(LoginRequiredMixin, CreateView):
@@ -61,12 +101,12 @@ class CreateArticleView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         ''' This method handles the form and saves the new object to the Django database.'''
 
-        # print the form data: 
-        print(f'CreateArticleView.form_valid(): {form.cleaned_data}')
+        # log the form data: 
+        logger.debug('CreateArticleView.form_valid(): %s', form.cleaned_data)
 
         # find the logged in user 
         user = self.request.user
-        print(f'CreateArticleView.form_valid(): {user}')
+        logger.debug('CreateArticleView.form_valid(): user=%s', user)
 
         # attach that user to the form instance (to the Article object)
         form.instance.user = user 
@@ -114,14 +154,14 @@ class CreateCommentView(CreateView):
         '''
 
         # instrument our code to display form fields: 
-        print(f"CreateCommentView.form_valid: form.cleaned_data={form.cleaned_data}")
+        logger.debug('CreateCommentView.form_valid: form.cleaned_data=%s', form.cleaned_data)
 
         pk = self.kwargs['pk']
         article = Article.objects.get(pk=pk)
         # attach the article to the comment
         form.instance.article = article # set the FK
 
-        # delegate the work to the superclass methom form_valid:
+        # delegate the work to the superclass method; saving the comment also counts it
         return super().form_valid(form)
     
 class UpdateArticleView(UpdateView):
@@ -140,16 +180,8 @@ class DeleteCommentView(DeleteView):
     def get_success_url(self):
         ''' Return the URL to redirect to after deleting a comment.'''
 
-         # find the PK for this Comment:
-        pk = self.kwargs['pk']
-
-        # find the Comment object:
-        comment = Comment.objects.get(pk=pk)
-
-        # find the PK of the Article which this comment is associated with:
-        article = comment.article
-
-        return reverse('article', kwargs={'pk': article.pk})
+        # the Article which this comment is associated with:
+        return reverse('article', kwargs={'pk': self.object.article_id})
     
 class UserRegistrationView(CreateView):
     ''' A view to show/process the registration form to create a new User.'''
@@ -0,0 +1,103 @@
+# File: caching.py
+# Author: A'Yanna Rouse (yanni620@bu.edu), 10/18/2026
+# Description: Whole-page caching for the apps' pages that look the same to every anonymous visitor,
+#              and conditional GET (ETag / Last-Modified) for detail pages.
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+
+def page_version_key(group):
+    ''' Return the cache key holding the current version of a group's cached pages.'''
+    return f'cs412:page_version:{group}'
+
+
+def clear_cached_pages(group):
+    ''' Drop every cached page in a group, after the content they show has changed.'''
+    cache.add(page_version_key(group), 1, None)
+    cache.incr(page_version_key(group))
+
+
+def page_cache_key(request, group):
+    ''' Return the cache key of the page at the request's URL, in the group's current version.'''
+    # the keys carry a version, so clear_cached_pages() can drop a whole group at once
+    version = cache.get_or_set(page_version_key(group), 1, None)
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'cs412:page:{group}:{version}:{url}'
+
+
+def cache_anonymous_page(timeout, group):
+    '''
+    Decorate a view to serve its GET responses from the cache for visitors without a session,
+    for up to timeout seconds or until clear_cached_pages(group) is called.
+    Visitors with a session (everyone logged in) always get a freshly rendered page.
+    '''
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            anonymous = request.method == 'GET' and settings.SESSION_COOKIE_NAME not in request.COOKIES
+            key = page_cache_key(request, group) if anonymous else None
+            if key is not None:
+                response = cache.get(key)
+                if response is not None:
+                    # a visitor holding this same page gets 304 Not Modified instead of the body
+                    return get_conditional_response(
+                        request, etag=response.get('ETag'),
+                        last_modified=parse_http_date_safe(response.get('Last-Modified', '')), response=response)
+
+            response = view(request, *args, **kwargs)
+            # the page differs between visitors with and without a session cookie
+            patch_vary_headers(response, ['Cookie'])
+
+            # never share a page that sets a cookie, such as a CSRF token
+            if key is not None and response.status_code == 200 and not response.cookies:
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.add_post_render_callback(lambda rendered: cache.set(key, rendered, timeout))
+                else:
+                    cache.set(key, response, timeout)
+            return response
+        return wrapped
+    return decorator
+
+
+class ConditionalGetMixin:
+    '''
+    Answer GET and HEAD requests with 304 Not Modified when the visitor's copy of the page is
+    still current, before the object is loaded or the template rendered.
+    Views define get_freshness(), which should cost a single small query.
+    '''
+
+    def get_freshness(self):
+        ''' Return (version, last_modified): a string that changes whenever the page would, and
+        the datetime of the page's last change, or None when no timestamp covers every change.
+        Return None to always render the page.
+        '''
+        return None
+
+    def get(self, request, *args, **kwargs):
+        ''' Return 304 Not Modified for a current copy, else the page with its ETag and Last-Modified.'''
+        freshness = self.get_freshness()
+        if freshness is None:
+            return super().get(request, *args, **kwargs)
+        version, last_modified = freshness
+
+        # the page differs between visitors, so the tag covers the session as well as the content
+        session = request.COOKIES.get(settings.SESSION_COOKIE_NAME, '')
+        etag = quote_etag(hashlib.md5(f'{version}:{session}'.encode()).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        # a 304 carries the validators too, so the visitor's copy stays current
+        if response.status_code in (200, 304):
+            response.headers.setdefault('ETag', etag)
+            if timestamp is not None:
+                response.headers.setdefault('Last-Modified', http_date(timestamp))
+        patch_vary_headers(response, ['Cookie'])
+        return response
@@ -0,0 +1,138 @@
+# File: csv_import.py
+# Author: A'Yanna Rouse (yanni620@bu.edu), 10/18/2026
+# Description: Shared plumbing for the management commands that bulk load CSV files into the apps' models.
+
+import csv
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+
+def read_batches(reader, batch_size):
+    ''' Yield lists of (line number, fields) pairs from a csv reader, batch_size rows at a time.'''
+    rows = enumerate(reader, start=2) # line 1 is the header
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class RejectWriter:
+    ''' Write rows that could not be loaded, with the reason, to a CSV side file.
+    The file is only created once the first row is rejected.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, line_number, fields, error):
+        ''' Record one rejected row.'''
+        if self._writer is None:
+            self._file = open(self.path, 'w', newline='')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(['line', 'error', 'fields'])
+        self._writer.writerow([line_number, error, *fields])
+        self.count += 1
+
+    def close(self):
+        ''' Close the side file if one was opened.'''
+        if self._file is not None:
+            self._file.close()
+
+
+class CSVImportCommand(BaseCommand):
+    '''
+    Base class for commands that stream a CSV file (or stdin) into the database.
+    Subclasses implement load(), which returns the number of rows read and a
+    summary of the changes, and may override finish() to run after every load.
+    '''
+
+    # stem of the default reject file name when reading from stdin
+    rejects_name = 'rows'
+
+    def add_arguments(self, parser):
+        ''' Define the command line arguments.'''
+        parser.add_argument('csv_path', help="path to the CSV file, or '-' to read from stdin")
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='number of rows converted and inserted per transaction (default: 2000)')
+        parser.add_argument('--rejects',
+                            help='file for rows that could not be loaded (default: <csv_path>.rejects.csv)')
+
+    def handle(self, *args, **options):
+        ''' Stream the CSV file into the database in batches.'''
+        self.verbosity = options['verbosity']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        path = options['csv_path']
+        rejects_path = options['rejects'] or (f'{self.rejects_name}.rejects.csv' if path == '-'
+                                              else f'{path}.rejects.csv')
+
+        try:
+            f = sys.stdin if path == '-' else open(path, newline='')
+        except OSError as e:
+            raise CommandError(f'Cannot open {path}: {e}')
+
+        rejects = RejectWriter(rejects_path)
+        started = time.perf_counter()
+        try:
+            reader = csv.reader(f)
+            next(reader, None) # discard headers
+            rows, summary = self.load(reader, batch_size, rejects, options)
+        finally:
+            rejects.close()
+            if f is not sys.stdin:
+                f.close()
+            self.finish(options)
+
+        elapsed = time.perf_counter() - started
+        rate = rows / elapsed if elapsed else 0
+        self.stdout.write(f'Done. {summary} in {elapsed:.2f}s ({rate:.0f} rows/s).')
+        if rejects.count:
+            self.stdout.write(f'Skipped {rejects.count} records; see {rejects.path}.')
+
+    def load(self, reader, batch_size, rejects, options):
+        ''' Load the rows from reader. Return the number of rows read and a summary of the changes.'''
+        raise NotImplementedError('subclasses of CSVImportCommand must provide a load() method')
+
+    def finish(self, options):
+        ''' Hook run after every load, whether or not it succeeded.'''
+        pass
+
+    def bulk_insert(self, reader, batch_size, rejects, from_csv_row, **values):
+        '''
+        Convert the rows from reader with from_csv_row and insert them with bulk_create,
+        one transaction per batch, sending rows that raise ValueError to rejects.
+        Extra keyword arguments are set on every instance. Return the number of rows created.
+        '''
+        created = 0
+        for batch in read_batches(reader, batch_size):
+            instances = []
+            for line_number, fields in batch:
+                try:
+                    instance = from_csv_row(fields)
+                except ValueError as e:
+                    rejects.write(line_number, fields, e)
+                    continue
+                for name, value in values.items():
+                    setattr(instance, name, value)
+                instances.append(instance)
+
+            if instances:
+                model = type(instances[0])
+                with transaction.atomic():
+                    model.objects.bulk_create(instances, batch_size=batch_size)
+            created += len(instances)
+
+            if self.verbosity >= 2:
+                self.stdout.write(f'  {created} rows loaded...')
+
+        return created
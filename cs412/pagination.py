@@ -0,0 +1,146 @@
+# File: pagination.py
+# Author: A'Yanna Rouse (yanni620@bu.edu), 10/18/2026
+# Description: Keyset (cursor) pagination shared by the apps' list views.
+
+from datetime import date
+from math import ceil
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    ''' One page of rows from KeysetPaginationMixin, with the query strings for its neighbouring pages.'''
+
+    def __init__(self, object_list, number, per_page, next_query=None, previous_query=None,
+                 count=None, count_query=None):
+        self.object_list = object_list
+        self.number = number
+        self.per_page = per_page
+        self.next_query = next_query
+        self.previous_query = previous_query
+        self.count = count
+        self.count_query = count_query
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_query is not None
+
+    def has_previous(self):
+        return self.previous_query is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def num_pages(self):
+        ''' The total number of pages, or None when the rows were not counted.'''
+        if self.count is None:
+            return None
+        return max(1, ceil(self.count / self.per_page))
+
+
+class KeysetPaginationMixin:
+    '''
+    Paginate a ListView by seeking past the last row shown instead of using OFFSET,
+    so a deep page costs the same as the first one.
+    The position is carried in an opaque, signed ?cursor= token. The total number
+    of rows is only counted when the request asks for it with ?count=on.
+    '''
+
+    # unique sort key the pages are cut on, '-' prefix for descending; the last field must be unique
+    keyset_fields = ('pk',)
+    cursor_salt = 'cs412.pagination'
+
+    def get_cursor_salt(self):
+        ''' Return the salt cursors are signed with, so a cursor only works on the view that made it.'''
+        return f'{self.cursor_salt}:{type(self).__name__}:{",".join(self.keyset_fields)}'
+
+    def read_cursor(self):
+        ''' Return the decoded cursor from the query string, or None for the first page.'''
+        token = self.request.GET.get('cursor')
+        if not token:
+            return None
+        try:
+            cursor = signing.loads(token, salt=self.get_cursor_salt())
+        except signing.BadSignature:
+            return None
+        if (not isinstance(cursor, dict) or cursor.get('dir') not in ('next', 'previous')
+                or not isinstance(cursor.get('page'), int)
+                or len(cursor.get('key', ())) != len(self.keyset_fields)):
+            return None
+        return cursor
+
+    def make_query(self, **params):
+        ''' Return the current query string with the given parameters replaced.'''
+        query = self.request.GET.copy()
+        for name, value in params.items():
+            query[name] = value
+        return query.urlencode()
+
+    def make_cursor_query(self, direction, row, number):
+        ''' Return the query string for the page before or after row.'''
+        key = [getattr(row, field.lstrip('-')) for field in self.keyset_fields]
+        # dates and datetimes go in the token as ISO strings, which the field lookups parse back
+        key = [value.isoformat() if isinstance(value, date) else value for value in key]
+        token = signing.dumps({'dir': direction, 'key': key, 'page': number}, salt=self.get_cursor_salt())
+        return self.make_query(cursor=token)
+
+    def seek(self, key, lookup):
+        ''' Return a filter for the rows sorting after (gt) or before (lt) key.'''
+        fields = [field.lstrip('-') for field in self.keyset_fields]
+        # on a descending field the rows sorting after key have smaller values
+        flipped = {'gt': 'lt', 'lt': 'gt'}[lookup]
+        lookups = [flipped if field.startswith('-') else lookup for field in self.keyset_fields]
+
+        seek = Q()
+        for i, field in enumerate(fields):
+            equal = {name: value for name, value in zip(fields[:i], key)}
+            seek |= Q(**equal, **{f'{field}__{lookups[i]}': key[i]})
+
+        if len(fields) == 1:
+            return seek
+        # the redundant bound on the leading field lets the database range-scan its index
+        return Q(**{f'{fields[0]}__{lookups[0]}e': key[0]}) & seek
+
+    def fetch_page(self, queryset, cursor, page_size):
+        ''' Return (number, rows, has_next) for the page named by cursor, or the first page for None.'''
+        if cursor is None or cursor['dir'] == 'next':
+            number = cursor['page'] if cursor else 1
+            if cursor:
+                queryset = queryset.filter(self.seek(cursor['key'], 'gt'))
+            # fetch one extra row to learn whether there is a next page
+            rows = list(queryset[:page_size + 1])
+            return number, rows[:page_size], len(rows) > page_size
+
+        # walk backwards from the cursor, then put the rows back in order
+        rows = list(queryset.filter(self.seek(cursor['key'], 'lt')).reverse()[:page_size])
+        rows.reverse()
+        return cursor['page'], rows, bool(rows)
+
+    def paginate_queryset(self, queryset, page_size):
+        ''' Return (paginator, page, object_list, is_paginated) for the page named by the cursor.'''
+        queryset = queryset.order_by(*self.keyset_fields)
+        cursor = self.read_cursor()
+        count = queryset.count() if self.request.GET.get('count') == 'on' else None
+
+        try:
+            number, rows, has_next = self.fetch_page(queryset, cursor, page_size)
+        except (ValueError, TypeError, ValidationError):
+            # a key the fields cannot take is treated like no cursor at all
+            number, rows, has_next = self.fetch_page(queryset, None, page_size)
+
+        next_query = self.make_cursor_query('next', rows[-1], number + 1) if has_next else None
+        previous_query = None
+        if number > 1 and rows:
+            previous_query = self.make_cursor_query('previous', rows[0], number - 1)
+
+        count_query = self.make_query(count='on') if count is None else None
+        page = KeysetPage(rows, number, page_size, next_query, previous_query, count, count_query)
+        return (None, page, rows, page.has_other_pages())
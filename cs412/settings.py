@@ -153,4 +153,47 @@ if socket.gethostname() == CS_DEPLOYMENT_HOSTNAME:
 # Load environment variables from .env file for Gemini API key
 load_dotenv()
 
-GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
\ No newline at end of file
+GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
+
+# Cache pages and friend suggestions in each process's memory by default.
+# Set DJANGO_CACHE_DIR to share one file-based cache between the worker processes,
+# so that clearing a cached page in one worker clears it in all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cs412',
+    },
+}
+if os.getenv('DJANGO_CACHE_DIR'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('DJANGO_CACHE_DIR'),
+    }
+
+# Log the apps' messages to the console as key=value fields.
+# Set DJANGO_LOG_LEVEL=DEBUG to see the per-request debugging lines.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            'format': 'time=%(asctime)s level=%(levelname)s logger=%(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        'blog': {
+            'handlers': ['console'],
+            'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
+        },
+        'mini_fb': {
+            'handlers': ['console'],
+            'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
@@ -0,0 +1,41 @@
+# File: load_results.py
+# Author: A'Yanna Rouse (yanni620@bu.edu), 10/18/2026
+# Description: Management command to bulk load one year of marathon results from a CSV file into the Result model.
+
+from django.db import transaction
+
+from cs412.csv_import import CSVImportCommand
+from marathon_analytics.models import Result
+from marathon_analytics.passing import update_passing_counts
+
+
+class Command(CSVImportCommand):
+    help = ('Load one race year of marathon results from a CSV file (or stdin) using batched bulk inserts. '
+            'Results from other years are left in place.')
+
+    rejects_name = 'results'
+
+    def add_arguments(self, parser):
+        ''' Define the command line arguments.'''
+        super().add_arguments(parser)
+        parser.add_argument('--year', type=int, required=True,
+                            help='race year of the file; earlier results for this year are replaced')
+
+    def load(self, reader, batch_size, rejects, options):
+        ''' Replace the results for one race year with the rows from reader.
+        The year is replaced in one transaction, so readers see the old results until
+        the new ones are complete, and a failed load leaves the old ones in place.
+        Return the number of rows read and a summary of the changes.
+        '''
+        year = options['year']
+
+        with transaction.atomic():
+            # delete existing records for this race to prevent duplicates:
+            Result.objects.filter(race_year=year).delete()
+
+            created = self.bulk_insert(reader, batch_size, rejects, Result.from_csv_row, race_year=year)
+
+            # compute the passing counts for the whole race in one sweep
+            update_passing_counts(Result.objects.filter(race_year=year))
+
+        return created, f'Created {created} {year} results'
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:37
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+
+class FenwickTree:
+    ''' A binary indexed tree of counts over the positions 1..size.'''
+
+    def __init__(self, size):
+        self.tree = [0] * (size + 1)
+
+    def add(self, position):
+        ''' Add one to the count at position.'''
+        while position < len(self.tree):
+            self.tree[position] += 1
+            position += position & -position
+
+    def prefix(self, position):
+        ''' Return the total count at positions 1..position.'''
+        total = 0
+        while position > 0:
+            total += self.tree[position]
+            position -= position & -position
+        return total
+
+
+def count_passes(runners):
+    '''
+    Given (key, start time of day, finish time of day) tuples for every runner in one race,
+    return {key: (runners passed, runners passed by)}.
+
+    A runner passed everyone who started strictly earlier and finished strictly later,
+    and was passed by everyone who started strictly later and finished strictly earlier.
+    Both counts come from two sweeps over the runners sorted by start time, with a
+    Fenwick tree over finish-time ranks, in O(n log n) overall.
+    A frozen copy for this migration, so later changes to marathon_analytics.passing
+    cannot change what it does.
+    '''
+
+    runners = sorted(runners, key=lambda runner: runner[1])
+    ranks = {finish: rank for rank, finish in enumerate(sorted({runner[2] for runner in runners}), start=1)}
+    passed = {}
+    passed_by = {}
+
+    # forwards: runners who started earlier and finished later were passed
+    earlier = FenwickTree(len(ranks))
+    inserted = 0
+    for start, group in groupby(runners, key=lambda runner: runner[1]):
+        group = list(group)
+        for key, start, finish in group:
+            passed[key] = inserted - earlier.prefix(ranks[finish])
+        for key, start, finish in group:
+            earlier.add(ranks[finish])
+        inserted += len(group)
+
+    # backwards: runners who started later and finished earlier passed this one
+    later = FenwickTree(len(ranks))
+    for start, group in groupby(reversed(runners), key=lambda runner: runner[1]):
+        group = list(group)
+        for key, start, finish in group:
+            passed_by[key] = later.prefix(ranks[finish] - 1)
+        for key, start, finish in group:
+            later.add(ranks[finish])
+
+    return {key: (passed[key], passed_by[key]) for key in passed}
+
+
+def compute_passing_counts(apps, schema_editor):
+    ''' Backfill the passing counts for results loaded before they were stored.'''
+    Result = apps.get_model('marathon_analytics', 'Result')
+    counts = count_passes(Result.objects.values_list('pk', 'start_time_of_day', 'finish_time_of_day'))
+    updated = [Result(pk=pk, runners_passed=passed, runners_passed_by=passed_by)
+               for pk, (passed, passed_by) in counts.items()]
+    Result.objects.bulk_update(updated, ['runners_passed', 'runners_passed_by'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marathon_analytics', '0002_result_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='result',
+            name='runners_passed',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='result',
+            name='runners_passed_by',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(compute_passing_counts, migrations.RunPython.noop),
+    ]
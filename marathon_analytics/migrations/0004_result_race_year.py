@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marathon_analytics', '0003_result_passing_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='result',
+            name='race_year',
+            field=models.IntegerField(default=2023),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['race_year', 'place_overall'], name='result_year_place_idx'),
+        ),
+    ]
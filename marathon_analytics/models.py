@@ -1,12 +1,27 @@
+from django.core.management import call_command
 from django.db import models
+from django.utils.dateparse import parse_time
+
+from .passing import update_passing_counts
+
+
+def parse_race_time(value):
+    '''Parse an H:MM:SS time from the results file, raising ValueError if it is not one.'''
+    parsed = parse_time(value)
+    if parsed is None:
+        raise ValueError(f'invalid time {value!r}')
+    return parsed
 
 # Create your models here.
 class Result(models.Model):
     '''
-    Store/represent the data from one runner at the Chicago Marathon 2023.
+    Store/represent the data from one runner at the Chicago Marathon (2023 unless race_year says otherwise).
     BIB,First Name,Last Name,CTZ,City,State,Gender,Division,
     Place Overall,Place Gender,Place Division,Start TOD,Finish TOD,Finish,HALF1,HALF2
     '''
+    # which race this result belongs to
+    race_year = models.IntegerField(default=2023)
+
     # identification
     bib = models.IntegerField()
     first_name = models.TextField()
@@ -32,62 +47,81 @@ class Result(models.Model):
     time_half1 = models.TimeField()
     time_half2 = models.TimeField()
 
+    # passing counts, precomputed for the whole race when results are loaded
+    runners_passed = models.IntegerField(null=True, blank=True)
+    runners_passed_by = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        ''' Indexes for the results list, which is ordered by place and filtered by city.'''
+        indexes = [
+            models.Index(fields=['place_overall'], name='result_place_idx'),
+            models.Index(fields=['city', 'place_overall'], name='result_city_place_idx'),
+            models.Index(fields=['race_year', 'place_overall'], name='result_year_place_idx'),
+        ]
 
     def __str__(self):
         '''Return a string representation of this model instance.'''
         return f'{self.first_name} {self.last_name} ({self.city}, {self.state}), {self.time_finish}'
     
+    @classmethod
+    def from_csv_row(cls, fields):
+        '''
+        Build an unsaved Result from one row of the marathon results CSV file.
+        Numbers and times are parsed up front, so a bad row raises ValueError here
+        instead of failing a whole batch at insert time.
+        '''
+
+        if len(fields) < 16:
+            raise ValueError(f'expected 16 fields, found {len(fields)}')
+
+        fields = [field.strip() for field in fields]
+
+        return cls(bib=int(fields[0]),
+                   first_name=fields[1],
+                   last_name=fields[2],
+                   ctz = fields[3],
+                   city = fields[4],
+                   state = fields[5],
+
+                   gender = fields[6],
+                   division = fields[7],
+
+                   place_overall = int(fields[8]),
+                   place_gender = int(fields[9]),
+                   place_division = int(fields[10]),
+
+                   start_time_of_day = parse_race_time(fields[11]),
+                   finish_time_of_day = parse_race_time(fields[12]),
+                   time_finish = parse_race_time(fields[13]),
+                   time_half1 = parse_race_time(fields[14]),
+                   time_half2 = parse_race_time(fields[15]),
+                  )
+
     def load_data(self):
         '''Function to load data records from CSV file into Django model instances.'''
-        
-        filename = '/Users/Yanni/Desktop/django/marathon_analytics/2023_chicago_results.csv'
-        f = open(filename)
-        f.readline() # discard headers
 
-        for line in f:
-            fields = line.split(',')
-        
-            try:
-                # create a new instance of Result object with this record from CSV
-                result = Result(bib=fields[0],
-                                first_name=fields[1],
-                                last_name=fields[2],
-                                ctz = fields[3],
-                                city = fields[4],
-                                state = fields[5],
-                                
-                                gender = fields[6],
-                                division = fields[7],
-
-                                place_overall = fields[8],
-                                place_gender = fields[9],
-                                place_division = fields[10],
-                            
-                                start_time_of_day = fields[11],
-                                finish_time_of_day = fields[12],
-                                time_finish = fields[13],
-                                time_half1 = fields[14],
-                                time_half2 = fields[15],
-                            )
-            
-                result.save() # commit to database
-                print(f'Created result: {result}')
-                
-            except:
-                print(f"Skipped: {fields}")
-        
-        print(f'Done. Created {len(Result.objects.all())} Results.')
+        # the bulk loader lives in the load_results management command
+        filename = '/Users/Yanni/Desktop/django/marathon_analytics/2023_chicago_results.csv'
+        call_command('load_results', filename, '--year', '2023')
 
     def get_runners_passed(self):
         '''Return the number of runners passed by this runner.'''
-        started_first = Result.objects.filter(start_time_of_day__lt=self.start_time_of_day)
+        if self.runners_passed is not None:
+            return self.runners_passed
+
+        # not precomputed yet: count them directly
+        started_first = Result.objects.filter(race_year=self.race_year, start_time_of_day__lt=self.start_time_of_day)
         passed = started_first.filter(finish_time_of_day__gt=self.finish_time_of_day)
 
-        return len(passed)
+        return passed.count()
         
     def get_runners_passed_by(self):
         '''Return the number of runners who passed this runner.'''
-        started_later = Result.objects.filter(start_time_of_day__gt=self.start_time_of_day)
+        if self.runners_passed_by is not None:
+            return self.runners_passed_by
+
+        # not precomputed yet: count them directly
+        started_later = Result.objects.filter(race_year=self.race_year, start_time_of_day__gt=self.start_time_of_day)
         passed_by = started_later.filter(finish_time_of_day__lt=self.finish_time_of_day)
 
-        return len(passed_by)
\ No newline at end of file
+        return passed_by.count()
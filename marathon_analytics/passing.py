@@ -0,0 +1,82 @@
+# File: passing.py
+# Author: A'Yanna Rouse (yanni620@bu.edu), 10/18/2026
+# Description: Count, for every runner in a race, how many runners they passed and were passed by.
+
+from itertools import groupby
+
+from django.db import connections, transaction
+
+
+class FenwickTree:
+    ''' A binary indexed tree of counts over the positions 1..size.'''
+
+    def __init__(self, size):
+        self.tree = [0] * (size + 1)
+
+    def add(self, position):
+        ''' Add one to the count at position.'''
+        while position < len(self.tree):
+            self.tree[position] += 1
+            position += position & -position
+
+    def prefix(self, position):
+        ''' Return the total count at positions 1..position.'''
+        total = 0
+        while position > 0:
+            total += self.tree[position]
+            position -= position & -position
+        return total
+
+
+def count_passes(runners):
+    '''
+    Given (key, start time of day, finish time of day) tuples for every runner in one race,
+    return {key: (runners passed, runners passed by)}.
+
+    A runner passed everyone who started strictly earlier and finished strictly later,
+    and was passed by everyone who started strictly later and finished strictly earlier.
+    Both counts come from two sweeps over the runners sorted by start time, with a
+    Fenwick tree over finish-time ranks, in O(n log n) overall.
+    '''
+
+    runners = sorted(runners, key=lambda runner: runner[1])
+    ranks = {finish: rank for rank, finish in enumerate(sorted({runner[2] for runner in runners}), start=1)}
+    passed = {}
+    passed_by = {}
+
+    # forwards: runners who started earlier and finished later were passed
+    earlier = FenwickTree(len(ranks))
+    inserted = 0
+    for start, group in groupby(runners, key=lambda runner: runner[1]):
+        group = list(group)
+        for key, start, finish in group:
+            passed[key] = inserted - earlier.prefix(ranks[finish])
+        for key, start, finish in group:
+            earlier.add(ranks[finish])
+        inserted += len(group)
+
+    # backwards: runners who started later and finished earlier passed this one
+    later = FenwickTree(len(ranks))
+    for start, group in groupby(reversed(runners), key=lambda runner: runner[1]):
+        group = list(group)
+        for key, start, finish in group:
+            passed_by[key] = later.prefix(ranks[finish] - 1)
+        for key, start, finish in group:
+            later.add(ranks[finish])
+
+    return {key: (passed[key], passed_by[key]) for key in passed}
+
+
+def update_passing_counts(results):
+    ''' Compute and store runners_passed/runners_passed_by for every Result in the queryset.'''
+
+    counts = count_passes(results.values_list('pk', 'start_time_of_day', 'finish_time_of_day'))
+
+    # one UPDATE per row by primary key; bulk_update's CASE expressions grow quadratically per batch
+    opts = results.model._meta
+    connection = connections[results.db]
+    qn = connection.ops.quote_name
+    sql = (f'UPDATE {qn(opts.db_table)} SET {qn("runners_passed")} = %s, {qn("runners_passed_by")} = %s '
+           f'WHERE {qn(opts.pk.column)} = %s')
+    with transaction.atomic(using=results.db), connection.cursor() as cursor:
+        cursor.executemany(sql, [(passed, passed_by, pk) for pk, (passed, passed_by) in counts.items()])
@@ -1,3 +1,164 @@
+import csv
+import io
+import os
+import random
+import tempfile
+from datetime import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from .models import Result, parse_race_time
+from .passing import count_passes
+from .views import get_result_charts
+
+HEADER = ('BIB,First Name,Last Name,CTZ,City,State,Gender,Division,'
+          'Place Overall,Place Gender,Place Division,Start TOD,Finish TOD,Finish,HALF1,HALF2')
+
+
+def make_row(bib, start='7:30:00', finish='11:30:00', place=None):
+    ''' Return one results file row for a runner.'''
+    return [str(bib), 'First', 'Last', 'USA', 'Chicago', 'IL', 'F', 'F30-34',
+            str(place or bib), str(place or bib), str(place or bib), start, finish, '4:00:00', '1:59:00', '2:01:00']
 
 # Create your tests here.
+class CountPassesTests(TestCase):
+    ''' Check the sweep agrees with counting every pair of runners directly.'''
+
+    def test_matches_pairwise_count(self):
+        rng = random.Random(412)
+        # few distinct times, so there are plenty of ties on start and finish
+        runners = [(i, time(7, rng.randrange(30)), time(11, rng.randrange(20))) for i in range(300)]
+
+        counts = count_passes(runners)
+
+        for key, start, finish in runners:
+            passed = sum(1 for _, s, f in runners if s < start and f > finish)
+            passed_by = sum(1 for _, s, f in runners if s > start and f < finish)
+            self.assertEqual(counts[key], (passed, passed_by))
+
+    def test_empty_race(self):
+        self.assertEqual(count_passes([]), {})
+
+
+class ParseTests(TestCase):
+    ''' Check rows of the results file are converted, or rejected with ValueError.'''
+
+    def test_parse_race_time(self):
+        self.assertEqual(parse_race_time('4:05:09'), time(4, 5, 9))
+        for value in ['', 'DNF', '25:00:00']:
+            with self.assertRaises(ValueError):
+                parse_race_time(value)
+
+    def test_from_csv_row(self):
+        result = Result.from_csv_row([f' {field} ' for field in make_row(12, '7:31:02', '11:59:59')])
+        self.assertEqual((result.bib, result.city, result.place_overall), (12, 'Chicago', 12))
+        self.assertEqual((result.start_time_of_day, result.finish_time_of_day), (time(7, 31, 2), time(11, 59, 59)))
+
+    def test_from_csv_row_rejects_bad_rows(self):
+        for row in [make_row(1)[:15], make_row('x'), make_row(1, finish='soon')]:
+            with self.assertRaises(ValueError):
+                Result.from_csv_row(row)
+
+
+class LoadResultsTests(TestCase):
+    ''' Check load_results replaces one year of results, all at once.'''
+
+    def write_file(self, rows):
+        ''' Write a results file and return its path.'''
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='') as f:
+            f.write(HEADER + '\n')
+            csv.writer(f).writerows(rows)
+        self.addCleanup(os.remove, f.name)
+        self.addCleanup(lambda: os.path.exists(f.name + '.rejects.csv') and os.remove(f.name + '.rejects.csv'))
+        return f.name
+
+    def load(self, rows, year):
+        ''' Run load_results on rows for a year and return its output.'''
+        out = io.StringIO()
+        call_command('load_results', self.write_file(rows), '--year', str(year), '--batch-size', '2', stdout=out)
+        return out.getvalue()
+
+    def test_load_replaces_only_its_year(self):
+        self.load([make_row(1), make_row(2)], 2022)
+        output = self.load([make_row(1, '7:30:00', '11:00:00'), make_row(2, '7:35:00', '10:50:00'),
+                            make_row(3, finish='late'), make_row(4, '7:40:00', '11:10:00')], 2023)
+        self.assertIn('Created 3 2023 results', output)
+        self.assertIn('Skipped 1 records', output)
+        self.assertEqual(Result.objects.filter(race_year=2022).count(), 2)
+
+        # passing counts are stored for the loaded race
+        counts = dict(Result.objects.filter(race_year=2023).values_list('bib', 'runners_passed_by'))
+        self.assertEqual(counts, {1: 1, 2: 0, 4: 0})
+
+    def test_rejects_file_lists_bad_rows(self):
+        path = self.write_file([make_row(1), make_row('x')])
+        call_command('load_results', path, '--year', '2023', stdout=io.StringIO())
+        with open(path + '.rejects.csv', newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ['line', 'error', 'fields'])
+        self.assertEqual(rows[1][0], '3')
+        self.assertEqual(rows[1][2], 'x')
+
+    def test_failed_load_keeps_the_old_year(self):
+        self.load([make_row(1), make_row(2)], 2023)
+        with mock.patch('marathon_analytics.management.commands.load_results.update_passing_counts',
+                        side_effect=RuntimeError('interrupted')):
+            with self.assertRaises(RuntimeError):
+                self.load([make_row(5), make_row(6), make_row(7)], 2023)
+        self.assertEqual(sorted(Result.objects.filter(race_year=2023).values_list('bib', flat=True)), [1, 2])
+
+
+class ResultChartTests(TestCase):
+    ''' Check the detail page charts are cached until the result they are drawn from changes.'''
+
+    def setUp(self):
+        cache.clear()
+        self.result = Result.from_csv_row(make_row(7))
+        self.result.runners_passed, self.result.runners_passed_by = 3, 1
+        self.result.save()
+
+    def test_cached_charts_run_no_queries(self):
+        with mock.patch('marathon_analytics.views.build_result_charts', return_value={'splits_figure': {}}) as build:
+            get_result_charts(self.result, 'json')
+            with self.assertNumQueries(0):
+                self.assertEqual(get_result_charts(self.result, 'json'), {'splits_figure': {}})
+        self.assertEqual(build.call_count, 1)
+
+    def test_changed_result_redraws_its_charts(self):
+        with mock.patch('marathon_analytics.views.build_result_charts', return_value={}) as build:
+            get_result_charts(self.result, 'json')
+            self.result.runners_passed = 4
+            get_result_charts(self.result, 'json')
+            get_result_charts(self.result, 'div')
+        self.assertEqual(build.call_count, 3)
+
+    def test_page_sends_figure_specs(self):
+        response = self.client.get(reverse('result_detail', args=[self.result.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'WARNING:')
+        self.assertContains(response, 'id="passed-figure"')
+        self.assertEqual(list(response.context['passed_figure']['data'][0]['y']), [3, 1])
+
+
+class ResultsListTests(TestCase):
+    ''' Check the results list filters by year and ignores years that are not one.'''
+
+    def setUp(self):
+        for bib, year in [(1, 2022), (2, 2023), (3, 2023)]:
+            result = Result.from_csv_row(make_row(bib))
+            result.race_year = year
+            result.save()
+
+    def test_year_filter(self):
+        response = self.client.get(reverse('results_list'), {'year': '2023'})
+        self.assertEqual([r.bib for r in response.context['results']], [2, 3])
+
+    def test_malformed_years_are_ignored(self):
+        for year in ['²', '２０２３', '99999999999999999999', 'soon']:
+            response = self.client.get(reverse('results_list'), {'year': year})
+            self.assertEqual(response.status_code, 200, year)
+            self.assertEqual(len(response.context['results']), 3, year)
@@ -4,9 +4,14 @@ from django.shortcuts import render
 from django.db.models.query import QuerySet #type: ignore
 from django.shortcuts import render #type: ignore
 from django.views.generic import ListView, DetailView #type: ignore
+from cs412.pagination import KeysetPaginationMixin
+from django.core.cache import cache
 from . models import Result
-import plotly
-import plotly.graph_objs as go
+import hashlib
+import json
+
+# how long a drawn chart stays cached; the key changes whenever its data does
+CHART_CACHE_TIMEOUT = 60 * 60 * 24
 
 # class ResultsListView(ListView):
 #     '''View to display marathon results'''
@@ -22,13 +27,14 @@ import plotly.graph_objs as go
     #     qs = super().get_queryset()
     #     return qs[:25]
 
-class ResultsListView(ListView):
+class ResultsListView(KeysetPaginationMixin, ListView):
     '''View to display marathon results'''
 
     template_name = 'marathon_analytics/results.html'
     model = Result
     context_object_name = 'results'
     paginate_by = 50
+    keyset_fields = ('place_overall', 'pk')
 
     def get_queryset(self):
         
@@ -36,6 +42,11 @@ class ResultsListView(ListView):
         results = super().get_queryset().order_by('place_overall')
 
         # filter results by these field(s):
+        year = self.request.GET.get('year', '')
+        # isdigit() alone accepts digits like '²' that int() rejects; a year has four ASCII digits
+        if year.isascii() and year.isdigit() and len(year) == 4:
+            results = results.filter(race_year=year)
+
         if 'city' in self.request.GET:
             city = self.request.GET['city']
             if city:
@@ -50,34 +61,68 @@ class ResultDetailView(DetailView):
     context_object_name = "r" #short for result
     template_name = 'marathon_analytics/result_detail.html'
 
+    # 'json' sends compact figure specs that one shared plotly.js bundle draws in the browser;
+    # 'div' inlines the plotly.js library into each chart
+    chart_format = 'json'
+
     def get_context_data(self, **kwargs):
         '''Add additional data to the context'''
         context = super().get_context_data(**kwargs)
         r = context['r'] # result for one runner
 
-        # create a graph of first half/second half time as pie chart
-        first_half_seconds = (r.time_half1.hour * 60 + r.time_half1.minute) * 60 + r.time_half1.second
-        seconds_half_seconds = (r.time_half2.hour * 60 + r.time_half2.minute) * 60 + r.time_half2.second
-        print(f"r={r}; First half: {first_half_seconds}, Second half: {seconds_half_seconds}")
-
-        # create the plotly graph object:
-        labels = ['first_half_seconds', 'second_half_seconds']
-        values = [first_half_seconds, seconds_half_seconds]
-
-        # create a pie chart
-        fig = go.Pie(labels=labels, values=values )
-        title_text = "Half Marathon Split (seconds)"
-        #obtain the graph as an HTML div
-        graph_div_splits = plotly.offline.plot({"data": [fig], "layout_title_text": title_text}, auto_open=False, output_type='div')
-        context['graph_div_splits'] = graph_div_splits
-
-        # create a bar chart with count of runners passed/passed by
-        x = [f'Runners Passed by {r.first_name}',f'Runners who Passed {r.first_name}']
-        y = [r.get_runners_passed(), r.get_runners_passed_by()]
-
-        fig = go.Bar(x=x, y=y)  
-        title_text = "Runners Passed/Passed By" 
-        graph_div_passed = plotly.offline.plot({"data": [fig], "layout_title_text": title_text}, auto_open=False, output_type='div')
-        context['graph_div_passed'] = graph_div_passed
+        # the charts for this result, from the cache when they have been drawn before
+        context.update(get_result_charts(r, self.chart_format))
         return context
-    
\ No newline at end of file
+
+
+def get_result_charts(r, chart_format):
+    '''
+    Return the context entries for the charts on a result's detail page.
+    They are cached per result and per version of the data they are drawn from,
+    so a reloaded or corrected result never shows a stale chart.
+    '''
+    # the key is built from the stored columns only, so a cache hit runs no queries
+    data = f'{r.first_name}|{r.time_half1}|{r.time_half2}|{r.runners_passed}|{r.runners_passed_by}'
+    version = hashlib.md5(data.encode()).hexdigest()[:12]
+    key = f'marathon_analytics:result_charts:{chart_format}:{r.pk}:{version}'
+
+    charts = cache.get(key)
+    if charts is None:
+        charts = build_result_charts(r, chart_format)
+        cache.set(key, charts, CHART_CACHE_TIMEOUT)
+    return charts
+
+
+def build_result_charts(r, chart_format):
+    ''' Draw the splits pie chart and the passed/passed by bar chart for one result.'''
+
+    # plotly is slow to import, so only load it once a chart is actually drawn
+    import plotly
+    import plotly.io
+    import plotly.graph_objs as go
+
+    # create a graph of first half/second half time as pie chart
+    first_half_seconds = (r.time_half1.hour * 60 + r.time_half1.minute) * 60 + r.time_half1.second
+    seconds_half_seconds = (r.time_half2.hour * 60 + r.time_half2.minute) * 60 + r.time_half2.second
+
+    # create the plotly graph object:
+    labels = ['first_half_seconds', 'second_half_seconds']
+    values = [first_half_seconds, seconds_half_seconds]
+
+    # create a pie chart
+    splits = go.Figure(data=[go.Pie(labels=labels, values=values)], layout_title_text="Half Marathon Split (seconds)")
+
+    # create a bar chart with count of runners passed/passed by
+    x = [f'Runners Passed by {r.first_name}',f'Runners who Passed {r.first_name}']
+    y = [r.get_runners_passed(), r.get_runners_passed_by()]
+    passed = go.Figure(data=[go.Bar(x=x, y=y)], layout_title_text="Runners Passed/Passed By")
+
+    if chart_format == 'json':
+        # plain figure specs, rendered with json_script in the template
+        return {'splits_figure': json.loads(plotly.io.to_json(splits)),
+                'passed_figure': json.loads(plotly.io.to_json(passed)),
+                'plotly_js_url': f'https://cdn.plot.ly/plotly-{plotly.offline.get_plotlyjs_version()}.min.js'}
+
+    #obtain the graphs as HTML divs
+    return {'graph_div_splits': plotly.offline.plot(splits, auto_open=False, output_type='div'),
+            'graph_div_passed': plotly.offline.plot(passed, auto_open=False, output_type='div')}
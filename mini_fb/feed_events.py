@@ -0,0 +1,115 @@
+# File: feed_events.py
+# Author: A'Yanna Rouse (yanni620@bu.edu), 10/18/2026
+# Description: Publish new status messages to the news feeds that are open in a browser, for the live feed stream.
+
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.module_loading import import_string
+
+from .models import StatusMessage
+
+# most posts a slow reader can fall behind by before newer ones are dropped
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    ''' The events waiting for one open news feed.'''
+
+    def __init__(self, profile_pk):
+        self.profile_pk = profile_pk
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    async def get(self):
+        ''' Wait for the next event.'''
+        return await self.queue.get()
+
+    def deliver(self, event):
+        ''' Queue an event; run on the subscriber's event loop.'''
+        if not self.queue.full():
+            self.queue.put_nowait(event)
+
+
+class InProcessBroker:
+    '''
+    Pub/sub between the request that posts a status message and the feed streams of its
+    author's friends, within one server process.
+    A broker shared between processes (Redis, Postgres LISTEN/NOTIFY) can stand in for it
+    by providing the same subscribe(), unsubscribe() and publish() methods and being named
+    in settings.MINI_FB_FEED_BROKER.
+    '''
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, profile_pk):
+        ''' Start collecting the events for a profile's feed. Call from the stream's event loop.'''
+        subscription = Subscription(profile_pk)
+        with self._lock:
+            self._subscriptions[profile_pk].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        ''' Stop collecting events for a closed feed.'''
+        with self._lock:
+            subscriptions = self._subscriptions[subscription.profile_pk]
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.profile_pk]
+
+    def publish(self, profile_pks, event):
+        ''' Send an event to every open feed of the given profiles. Safe to call from any thread.'''
+        with self._lock:
+            subscriptions = [subscription for pk in profile_pks for subscription in self._subscriptions.get(pk, ())]
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # the stream's event loop has shut down
+                self.unsubscribe(subscription)
+
+
+# one broker per configured class, made on first use
+_brokers = {}
+
+
+def get_broker():
+    ''' Return the broker named by settings.MINI_FB_FEED_BROKER, the in-process one by default.'''
+    path = getattr(settings, 'MINI_FB_FEED_BROKER', 'mini_fb.feed_events.InProcessBroker')
+    if path not in _brokers:
+        _brokers[path] = import_string(path)()
+    return _brokers[path]
+
+
+def make_event(status_message):
+    ''' Return the event for one status message: its pk and its feed entry, rendered once for every reader.'''
+    html = render_to_string('mini_fb/news_feed_entry.html', {'post': status_message})
+    return {'id': status_message.pk, 'html': html}
+
+
+def publish_status_message(status_message):
+    ''' Push a new status message onto the open feeds of its author's friends.'''
+    friend_pks = list(status_message.profile.get_friends_queryset().values_list('pk', flat=True))
+    if friend_pks:
+        get_broker().publish(friend_pks, make_event(status_message))
+
+
+def get_missed_events(profile_pk, after, limit=20):
+    ''' Return the events for posts on a profile's timeline newer than the status message pk after.'''
+    status_messages = (StatusMessage.objects
+                       .filter(timelineentry__profile_id=profile_pk, pk__gt=after)
+                       .select_related('profile')
+                       .prefetch_related(StatusMessage.prefetch_images())
+                       .order_by('pk')[:limit])
+    return [make_event(status_message) for status_message in status_messages]
+
+
+def format_event(event):
+    ''' Return an event in the text/event-stream format.'''
+    return f'id: {event["id"]}\ndata: {json.dumps(event)}\n\n'
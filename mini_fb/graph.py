@@ -0,0 +1,50 @@
+# File: graph.py
+# Author: A'Yanna Rouse (yanni620@bu.edu), 10/18/2026
+# Description: Summarize the shape of the friendship graph: its degree distribution and connected components.
+
+from collections import Counter
+
+
+def graph_stats(edges):
+    '''
+    Given an iterable of (profile pk, profile pk) friendships, each stored once, return a dict of
+    profiles (with at least one friend), friendships, components, largest_component and
+    degrees (a Counter of degree -> number of profiles).
+    The edges are read in one pass, with a union-find over the profiles for the components.
+    '''
+    degree = Counter()
+    parent = {}
+    size = {}
+
+    def find(pk):
+        ''' Return the root of pk's component, halving the path on the way.'''
+        while parent[pk] != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    friendships = 0
+    for a, b in edges:
+        friendships += 1
+        degree[a] += 1
+        degree[b] += 1
+        for pk in (a, b):
+            if pk not in parent:
+                parent[pk] = pk
+                size[pk] = 1
+
+        # join the smaller component onto the larger
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            if size[root_a] < size[root_b]:
+                root_a, root_b = root_b, root_a
+            parent[root_b] = root_a
+            size[root_a] += size.pop(root_b)
+
+    return {
+        'profiles': len(degree),
+        'friendships': friendships,
+        'components': len(size),
+        'largest_component': max(size.values(), default=0),
+        'degrees': Counter(degree.values()),
+    }
@@ -0,0 +1,79 @@
+# File: load_friends.py
+# Author: A'Yanna Rouse (yanni620@bu.edu), 10/18/2026
+# Description: Management command to bulk load a friendship edge list (CSV of profile pk pairs) and report the graph's shape.
+
+from statistics import median
+
+from cs412.csv_import import CSVImportCommand, read_batches
+from mini_fb.graph import graph_stats
+from mini_fb.models import Friend, Profile
+
+
+class Command(CSVImportCommand):
+    help = ('Add friendships from a CSV file (or stdin) of profile pk pairs, one pair per row after a header, '
+            'then report the degree distribution and components of the friendship graph.')
+
+    rejects_name = 'friends'
+
+    def load(self, reader, batch_size, rejects, options):
+        ''' Add the friendships from reader in batches.
+        Return the number of rows read and a summary of the changes.
+        '''
+        profile_pks = set(Profile.objects.values_list('pk', flat=True))
+        seen = set()
+        rows = created = repeated = 0
+
+        for batch in read_batches(reader, batch_size):
+            pairs = []
+            for line_number, fields in batch:
+                try:
+                    a, b = (int(field) for field in fields[:2])
+                except ValueError:
+                    rejects.write(line_number, fields, 'expected two profile pks')
+                    continue
+                if a == b:
+                    rejects.write(line_number, fields, 'a profile cannot befriend itself')
+                    continue
+                if a not in profile_pks or b not in profile_pks:
+                    rejects.write(line_number, fields, 'no such profile')
+                    continue
+                rows += 1
+
+                # a pair is the same friendship whichever way round it is listed
+                pair = (min(a, b), max(a, b))
+                if pair in seen:
+                    repeated += 1
+                    continue
+                seen.add(pair)
+                pairs.append(pair)
+
+            created += Friend.add_pairs(pairs)
+            if self.verbosity >= 2:
+                self.stdout.write(f'  {rows} pairs read...')
+
+        self.report_graph()
+        existed = rows - repeated - created
+        return rows, f'Created {created} friendships ({repeated} repeated in the file, {existed} already friends)'
+
+    def report_graph(self):
+        ''' Report the shape of the whole friendship graph, read in one pass.'''
+        stats = graph_stats(Friend.objects.values_list('profile1', 'profile2').iterator(chunk_size=10000))
+        isolated = Profile.objects.count() - stats['profiles']
+
+        self.stdout.write(f"Friendship graph: {stats['friendships']} friendships between {stats['profiles']} profiles "
+                          f"({isolated} without friends), in {stats['components']} components, "
+                          f"the largest with {stats['largest_component']} profiles.")
+        degrees = stats['degrees']
+        if not degrees:
+            return
+        each = sorted(degrees.elements())
+        self.stdout.write(f'Friends per profile: mean {2 * stats["friendships"] / stats["profiles"]:.1f}, '
+                          f'median {median(each):g}, max {each[-1]}.')
+
+        # degrees bucketed by powers of two: 1, 2-3, 4-7, ...
+        buckets = {}
+        for degree, count in degrees.items():
+            low = 1 << (degree.bit_length() - 1)
+            buckets[low] = buckets.get(low, 0) + count
+        self.stdout.write('Degree distribution: ' + ', '.join(
+            f'{low}{"" if low == 1 else f"-{2 * low - 1}"}: {count}' for low, count in sorted(buckets.items())))
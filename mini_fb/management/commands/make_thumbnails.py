@@ -0,0 +1,29 @@
+# File: make_thumbnails.py
+# Author: A'Yanna Rouse (yanni620@bu.edu), 10/18/2026
+# Description: Management command to make the resized and WebP variants of images uploaded before they were built on upload.
+
+from django.core.management.base import BaseCommand
+
+from mini_fb.models import Image
+from mini_fb.thumbnails import make_variants
+
+
+class Command(BaseCommand):
+    help = 'Make the resized and WebP variants of mini_fb images that do not have them yet.'
+
+    def add_arguments(self, parser):
+        ''' Define the command line arguments.'''
+        parser.add_argument('--all', action='store_true',
+                            help='remake the variants of every image, not only the ones missing them')
+
+    def handle(self, *args, **options):
+        ''' Make the variants in this process, one image at a time.'''
+        images = Image.objects.order_by('pk')
+        if not options['all']:
+            images = images.filter(thumbnail='')
+
+        count = 0
+        for image in images.iterator():
+            make_variants(image)
+            count += 1
+        self.stdout.write(f'Done. Processed {count} images.')
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+def canonicalize_friends(apps, schema_editor):
+    ''' Store every existing pair once, lower profile pk first, dropping self-friendships.'''
+    Friend = apps.get_model('mini_fb', 'Friend')
+    seen = set()
+    for friend in Friend.objects.order_by('pk'):
+        pair = tuple(sorted([friend.profile1_id, friend.profile2_id]))
+        if pair[0] == pair[1] or pair in seen:
+            friend.delete()
+            continue
+        seen.add(pair)
+        if pair != (friend.profile1_id, friend.profile2_id):
+            Friend.objects.filter(pk=friend.pk).update(profile1_id=pair[0], profile2_id=pair[1])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_fb', '0007_profile_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(canonicalize_friends, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='friend',
+            index=models.Index(fields=['profile2', 'profile1'], name='friend_reverse_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='friend',
+            constraint=models.UniqueConstraint(fields=('profile1', 'profile2'), name='friend_unique_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='friend',
+            constraint=models.CheckConstraint(condition=models.Q(('profile1__lt', models.F('profile2'))), name='friend_ordered_pair'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_timelines(apps, schema_editor):
+    ''' Put every existing status message on the timelines of its author's friends.'''
+    Friend = apps.get_model('mini_fb', 'Friend')
+    StatusMessage = apps.get_model('mini_fb', 'StatusMessage')
+    TimelineEntry = apps.get_model('mini_fb', 'TimelineEntry')
+    for profile1_id, profile2_id in Friend.objects.values_list('profile1_id', 'profile2_id'):
+        for owner, author in [(profile1_id, profile2_id), (profile2_id, profile1_id)]:
+            TimelineEntry.objects.bulk_create(
+                [TimelineEntry(profile_id=owner, status_message_id=pk, timestamp=timestamp)
+                 for pk, timestamp in StatusMessage.objects.filter(profile_id=author).values_list('pk', 'timestamp')],
+                ignore_conflicts=True,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_fb', '0008_friend_symmetric_pairs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='mini_fb.profile')),
+                ('status_message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='mini_fb.statusmessage')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['profile', '-timestamp', '-id'], name='timeline_feed_idx')],
+                'constraints': [models.UniqueConstraint(fields=('profile', 'status_message'), name='timeline_unique_entry')],
+            },
+        ),
+        migrations.RunPython(build_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_fb', '0010_profile_city_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to='images/'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='thumbnail_webp',
+            field=models.ImageField(blank=True, upload_to='images/'),
+        ),
+    ]
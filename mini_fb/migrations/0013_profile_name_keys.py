@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fold_names(apps, schema_editor):
+    ''' Store the casefolded names of every existing profile.'''
+    Profile = apps.get_model('mini_fb', 'Profile')
+    profiles = list(Profile.objects.only('first_name', 'last_name'))
+    for profile in profiles:
+        profile.first_name_key = profile.first_name.casefold()
+        profile.last_name_key = profile.last_name.casefold()
+    Profile.objects.bulk_update(profiles, ['first_name_key', 'last_name_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_fb', '0012_profile_directory_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='profile',
+            name='profile_last_name_lower_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='profile',
+            name='profile_first_name_lower_idx',
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='first_name_key',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='last_name_key',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['last_name_key'], name='profile_last_name_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['first_name_key'], name='profile_first_name_key_idx'),
+        ),
+        migrations.RunPython(fold_names, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,19 @@
 # File: models.py
 # Author: A'Yanna Rouse (yanni620@bu.edu), 02/20/2025
 # Description: This file contains the model for the Profile object.
-from django.db import models # type: ignore
+from django.db import models, transaction # type: ignore
+from django.db.models import F, Func, OuterRef, Prefetch, Q, Subquery, Value # type: ignore
+from django.db.models.functions import Concat # type: ignore
 from django import forms # type: ignore
 from django.urls import reverse # type: ignore
 from django.contrib.auth.models import User # type: ignore
+from django.core.cache import cache # type: ignore
+from collections import Counter, defaultdict
+
+# how many friend suggestions are shown, and how long they stay cached between friendships
+FRIEND_SUGGESTION_LIMIT = 20
+FRIEND_SUGGESTION_CACHE_TIMEOUT = 60 * 60
+FRIEND_SUGGESTIONS_VERSION_KEY = 'mini_fb:friend_suggestions_version'
 
 # Create your models here.
 class Profile(models.Model):
@@ -17,59 +26,188 @@ class Profile(models.Model):
     email = models.EmailField()
     image_url = models.URLField(blank=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # the names casefolded by save(), for the directory's case-insensitive prefix search
+    first_name_key = models.TextField(blank=True, editable=False)
+    last_name_key = models.TextField(blank=True, editable=False)
+
+    # friends memoized by get_friends()
+    _friends = None
+
+    class Meta:
+        indexes = [
+            # same-city friend suggestions and the directory's city filter
+            models.Index(fields=['city'], name='profile_city_idx'),
+            # the directory's order, which its pages are cut on
+            models.Index(fields=['last_name', 'first_name', 'id'], name='profile_name_idx'),
+            # case-insensitive name prefix search in the directory
+            models.Index(fields=['last_name_key'], name='profile_last_name_key_idx'),
+            models.Index(fields=['first_name_key'], name='profile_first_name_key_idx'),
+        ]
     
     def __str__(self):
         ''' Return a string representation of this model instance.'''
         return f'{self.first_name} {self.last_name}'
+
+    def save(self, *args, **kwargs):
+        ''' Refresh the name keys from the names before saving.'''
+        # SQLite's LOWER() only folds ASCII, so the names are folded here, where every letter is
+        self.first_name_key = self.first_name.casefold()
+        self.last_name_key = self.last_name.casefold()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'first_name_key', 'last_name_key'}
+        super().save(*args, **kwargs)
     
     def get_absolute_url(self):
         ''' Return a URL to display one instance of this object.'''
         return reverse('show_profile')
     
     def get_status_messages(self):
-        ''' Return all status messages for this profile.'''
-        return StatusMessage.objects.filter(profile=self).order_by('timestamp')
+        ''' Return all status messages for this profile, with their images.'''
+        return StatusMessage.objects.filter(profile=self).order_by('timestamp').prefetch_related(StatusMessage.prefetch_images())
     
-    def get_friends(self):
-        ''' Return a list of friends for this profile.'''
-        friends = []
+    def get_friends_queryset(self):
+        ''' Return an unevaluated QuerySet of this profile's friends.'''
+        # the profiles on the other end of every edge touching this one
+        return Profile.objects.filter(
+            Q(pk__in=Friend.objects.filter(profile1=self).values('profile2')) |
+            Q(pk__in=Friend.objects.filter(profile2=self).values('profile1'))
+        )
 
-        for friend in Friend.objects.filter(profile1=self):
-            friends.append(friend.profile2)
+    @classmethod
+    def get_page_version(cls, pk):
+        '''
+        Return a string that changes whenever the profile page of pk would, or None if there is no such profile.
+        The profile's own fields, the count and newest timestamp of its posts, its finished thumbnails,
+        and its friends with the fields the page shows of them are read in one query.
+        '''
+        def scalar(queryset, function, expression='pk'):
+            # one aggregate over the matching rows, without grouping, as a column of the outer query
+            return Subquery(queryset.order_by().annotate(value=Func(expression, function=function)).values('value')[:1])
 
-        for friend in Friend.objects.filter(profile2=self):
-            friends.append(friend.profile1)
+        posts = StatusMessage.objects.filter(profile=OuterRef('pk'))
+        # the profiles on either side of this profile's friend edges
+        friends = Profile.objects.filter(
+            Q(pk__in=Friend.objects.filter(profile1=OuterRef(OuterRef('pk'))).values('profile2'))
+            | Q(pk__in=Friend.objects.filter(profile2=OuterRef(OuterRef('pk'))).values('profile1')))
+        friend_fields = Concat('pk', Value('|'), 'first_name', Value('|'), 'last_name', Value('|'), 'image_url',
+                               output_field=models.TextField())
+        row = (cls.objects.filter(pk=pk)
+               .annotate(
+                   posts=scalar(posts, 'COUNT'),
+                   last_post=scalar(posts, 'MAX', 'timestamp'),
+                   thumbnails=scalar(Image.objects.filter(profile=OuterRef('pk')).exclude(thumbnail=''), 'COUNT'),
+                   friends=scalar(friends, 'COUNT'),
+                   last_friend=scalar(friends, 'MAX'),
+                   friend_fields=scalar(friends, 'GROUP_CONCAT', friend_fields),
+               )
+               .values_list('first_name', 'last_name', 'city', 'email', 'image_url', 'user_id',
+                            'posts', 'last_post', 'thumbnails', 'friends', 'last_friend', 'friend_fields')
+               .first())
+        if row is None:
+            return None
+        return ':'.join(str(value) for value in row)
 
-        return friends
+    def get_friends(self):
+        ''' Return a list of friends for this profile.
+        The friends are read once per instance, so repeated calls while rendering a page are free.
+        '''
+        if self._friends is None:
+            self._friends = list(self.get_friends_queryset())
+        return self._friends
     
     def add_friend(self, other):
         ''' Add a friend relationship between this profile and another.'''
-        Friend.objects.create(profile1=self, profile2=other)
+
+        # no friending yourself, and the pair is stored once whichever side added it
+        if other.pk == self.pk:
+            return
+        profile1, profile2 = sorted([self, other], key=lambda profile: profile.pk)
+        friend, created = Friend.objects.get_or_create(profile1=profile1, profile2=profile2)
+
+        # each side's existing status messages now belong on the other's timeline
+        if created:
+            TimelineEntry.objects.bulk_create(
+                [TimelineEntry(profile=self, status_message_id=pk, timestamp=timestamp)
+                 for pk, timestamp in other.statusmessage_set.values_list('pk', 'timestamp')] +
+                [TimelineEntry(profile=other, status_message_id=pk, timestamp=timestamp)
+                 for pk, timestamp in self.statusmessage_set.values_list('pk', 'timestamp')],
+                ignore_conflicts=True,
+            )
+
+        # the memoized friend lists on both sides are now stale
+        self._friends = None
+        other._friends = None
+
+        # so are the suggestions for both sides, and for their friends, whose mutual friends have changed
+        if created:
+            affected = {self.pk, other.pk}
+            for profile in [self, other]:
+                affected.update(profile.get_friends_queryset().values_list('pk', flat=True))
+            cache.delete_many(Profile.friend_suggestions_keys(affected))
+
+    @staticmethod
+    def friend_suggestions_keys(pks):
+        ''' Return the cache keys of the friend suggestions for the profiles with these pks.'''
+        # the keys carry a version, so clear_friend_suggestions() can drop them all at once
+        version = cache.get_or_set(FRIEND_SUGGESTIONS_VERSION_KEY, 1, None)
+        return [f'mini_fb:friend_suggestions:{version}:{pk}' for pk in pks]
+
+    @staticmethod
+    def clear_friend_suggestions():
+        ''' Drop the cached friend suggestions of every profile, after friendships are added in bulk.'''
+        cache.add(FRIEND_SUGGESTIONS_VERSION_KEY, 1, None)
+        cache.incr(FRIEND_SUGGESTIONS_VERSION_KEY)
+
+    def rank_friend_suggestions(self, limit=FRIEND_SUGGESTION_LIMIT):
+        '''
+        Return up to limit (profile pk, mutual friend count) pairs for people this profile
+        may know: friends of friends with the most mutual friends first, then profiles
+        in the same city.
+        '''
+        friend_pks = {friend.pk for friend in self.get_friends()}
+        excluded = friend_pks | {self.pk}
+
+        # two hops: every edge touching a friend leads to a candidate on its other end
+        mutual = Counter()
+        edges = Friend.objects.filter(Q(profile1__in=friend_pks) | Q(profile2__in=friend_pks))
+        for profile1, profile2 in edges.values_list('profile1', 'profile2'):
+            if profile1 in friend_pks and profile2 not in excluded:
+                mutual[profile2] += 1
+            if profile2 in friend_pks and profile1 not in excluded:
+                mutual[profile1] += 1
+        ranked = sorted(mutual.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+        # top up with strangers from the same city
+        if len(ranked) < limit and self.city:
+            chosen = excluded | {pk for pk, count in ranked}
+            same_city = (Profile.objects.filter(city=self.city).exclude(pk__in=chosen)
+                         .order_by('pk').values_list('pk', flat=True)[:limit - len(ranked)])
+            ranked += [(pk, 0) for pk in same_city]
+        return ranked
 
     def get_friend_suggestions(self):
-        ''' Return a list of friend suggestions for this profile.'''
-        
-        # Get all profiles except the current one
-        all_profiles = Profile.objects.exclude(pk=self.pk)
-        
-        # Get current friends
-        current_friends = self.get_friends()
-        
-        # Exclude current friends from the suggestions
-        suggestions = all_profiles.exclude(pk__in=[friend.pk for friend in current_friends])
-        
+        ''' Return a list of friend suggestions for this profile, each with its mutual_friends count.'''
+
+        # the ranking is cached until this profile or one of its friends makes a new friend
+        [key] = Profile.friend_suggestions_keys([self.pk])
+        ranked = cache.get(key)
+        if ranked is None:
+            ranked = self.rank_friend_suggestions()
+            cache.set(key, ranked, FRIEND_SUGGESTION_CACHE_TIMEOUT)
+
+        profiles = Profile.objects.in_bulk([pk for pk, count in ranked])
+        suggestions = []
+        for pk, count in ranked:
+            # skip anyone deleted since the ranking was cached
+            if pk in profiles:
+                profiles[pk].mutual_friends = count
+                suggestions.append(profiles[pk])
         return suggestions
     
     def get_news_feed(self):
-        ''' Return a list of status messages from friends.'''
-        
-        # Get friends
-        friends = self.get_friends()
-        
-        # Get status messages from friends
-        news_feed = StatusMessage.objects.filter(profile__in=friends).order_by('-timestamp')
-        
-        return news_feed
+        ''' Return a list of status messages from friends, newest first.'''
+        return StatusMessage.objects.filter(timelineentry__profile=self).order_by('-timelineentry__timestamp')
     
 class StatusMessage(models.Model):
     ''' Encapsulate the data of a status message.'''
@@ -82,12 +220,38 @@ class StatusMessage(models.Model):
     def __str__(self):
         ''' Return a string representation of this model instance.'''
         return f'{self.message}'
+
+    def save(self, *args, **kwargs):
+        ''' Save the message and push it onto the timelines of the author's friends.'''
+        created = self._state.adding
+        super().save(*args, **kwargs)
+
+        if created:
+            # fan out on write: one timeline row per friend, so reading a feed never looks up friends
+            TimelineEntry.objects.bulk_create(
+                [TimelineEntry(profile_id=pk, status_message=self, timestamp=self.timestamp)
+                 for pk in self.profile.get_friends_queryset().values_list('pk', flat=True)],
+                ignore_conflicts=True,
+            )
+        else:
+            # editing a message moves it up the feeds, as it did when they were sorted on the message itself
+            TimelineEntry.objects.filter(status_message=self).update(timestamp=self.timestamp)
     
+    @staticmethod
+    def prefetch_images(prefix=''):
+        ''' Return a Prefetch that loads the images of the status messages reached through prefix,
+        in one query, for get_images() to use.
+        '''
+        return Prefetch(f'{prefix}statusimage_set', queryset=StatusImage.objects.select_related('image_file'))
+
     def get_images(self):
         '''
-        Returns a QuerySet of Image objects associated with this status message
+        Returns the Image objects associated with this status message
         by following the StatusImage relationship.
         '''
+        # use the status images when they were prefetched with their images
+        if 'statusimage_set' in getattr(self, '_prefetched_objects_cache', {}):
+            return [status_image.image_file for status_image in self.statusimage_set.all()]
         return Image.objects.filter(statusimage__status_message=self)
     
 class CreateProfileForm(forms.ModelForm):
@@ -112,11 +276,20 @@ class Image(models.Model):
     timestamp = models.DateTimeField(auto_now=True)
     image_file = models.ImageField(upload_to='images/')
     caption = models.TextField(blank=True, null=True)
+    # smaller variants of image_file, made in the background after upload (see thumbnails.py)
+    thumbnail = models.ImageField(upload_to='images/', blank=True)
+    thumbnail_webp = models.ImageField(upload_to='images/', blank=True)
 
     def __str__(self):
         ''' Return a string representation of this model instance.'''
         return f'Image uploaded by {self.profile} on {self.timestamp}'
 
+    def get_display_url(self):
+        ''' Return the URL of the resized image, or of the original until it has been resized.'''
+        if self.thumbnail:
+            return self.thumbnail.url
+        return self.image_file.url
+
 class StatusImage(models.Model):
     ''' Encapsulate the data of a status image.'''
 
@@ -129,13 +302,93 @@ class StatusImage(models.Model):
         return f'Image {self.image_file.id} associated with StatusMessage {self.status_message.id}'
     
 class Friend(models.Model):
-    ''' Encapsulate the data of a friend relationship.'''
+    ''' Encapsulate the data of a friend relationship.
+    Friendship is symmetric, so each pair is stored once with the lower profile pk as profile1.
+    '''
 
     # Define the data attributes of the Friend object
     profile1 = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='profile1')
     profile2 = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='profile2')
     timestamp = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # one edge per pair, in canonical order (which also rules out befriending yourself)
+            models.UniqueConstraint(fields=['profile1', 'profile2'], name='friend_unique_pair'),
+            models.CheckConstraint(condition=Q(profile1__lt=F('profile2')), name='friend_ordered_pair'),
+        ]
+        indexes = [
+            # covers the profile2 -> profile1 direction; the unique constraint covers the other one
+            models.Index(fields=['profile2', 'profile1'], name='friend_reverse_idx'),
+        ]
+
+    def __str__(self):
+        ''' Return a string representation of this model instance.'''
+        return f'{self.profile1} is friends with {self.profile2}'
+
+    def save(self, *args, **kwargs):
+        ''' Store the pair in canonical order before saving.'''
+        if self.profile1_id is not None and self.profile2_id is not None and self.profile1_id > self.profile2_id:
+            self.profile1, self.profile2 = self.profile2, self.profile1
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def add_pairs(cls, pairs):
+        '''
+        Add the friendships between many (profile pk, profile pk) pairs at once, in one transaction.
+        Pairs may be in either order; self-friendships, repeats and existing friendships are skipped.
+        Timelines and suggestions are updated as add_friend() does. Return the number of friendships created.
+        '''
+        pairs = {(min(a, b), max(a, b)) for a, b in pairs if a != b}
+        if not pairs:
+            return 0
+
+        with transaction.atomic():
+            # drop the pairs that are already friends, read through the lower sides of the batch
+            pairs -= set(cls.objects.filter(profile1__in={a for a, b in pairs}).values_list('profile1', 'profile2'))
+            if not pairs:
+                return 0
+            cls.objects.bulk_create([cls(profile1_id=a, profile2_id=b) for a, b in pairs], ignore_conflicts=True)
+            created = len(pairs)
+
+            # each side's existing status messages belong on the other's timeline;
+            # entries already there from an earlier friendship are skipped by the unique constraint
+            endpoints = {pk for pair in pairs for pk in pair}
+            messages = defaultdict(list)
+            for pk, author, timestamp in (StatusMessage.objects.filter(profile__in=endpoints)
+                                          .values_list('pk', 'profile', 'timestamp')):
+                messages[author].append((pk, timestamp))
+            TimelineEntry.objects.bulk_create(
+                [TimelineEntry(profile_id=owner, status_message_id=pk, timestamp=timestamp)
+                 for a, b in pairs for owner, author in [(a, b), (b, a)] for pk, timestamp in messages[author]],
+                ignore_conflicts=True,
+            )
+
+        # mutual friends have changed all over the graph
+        Profile.clear_friend_suggestions()
+        return created
+
+
+class TimelineEntry(models.Model):
+    ''' One status message on the news feed of one profile.
+    Rows are written when a friend posts or a friendship is made, and removed with the message.
+    '''
+
+    # Define the data attributes of the TimelineEntry object
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
+    status_message = models.ForeignKey(StatusMessage, on_delete=models.CASCADE)
+    # copy of the message's timestamp, so a feed page is read from this table's index alone
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'status_message'], name='timeline_unique_entry'),
+        ]
+        indexes = [
+            # a feed page is a range of this index, newest first
+            models.Index(fields=['profile', '-timestamp', '-id'], name='timeline_feed_idx'),
+        ]
+
     def __str__(self):
         ''' Return a string representation of this model instance.'''
-        return f'{self.profile1} is friends with {self.profile2}'  
\ No newline at end of file
+        return f'{self.status_message} on the news feed of {self.profile}'
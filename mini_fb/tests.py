@@ -1,3 +1,567 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+import asyncio
+import io
+import json
+import threading
+import os
+import shutil
+import sys
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from unittest import mock
+from PIL import Image as PILImage
+from django.urls import reverse
+
+from .models import Friend, Image, Profile, StatusImage, StatusMessage, TimelineEntry
+from .thumbnails import make_variants
+from .feed_events import InProcessBroker, get_broker
+from .graph import graph_stats
+from .views import prefix_range_end
+
+
+def make_profile(name):
+    ''' Create a profile, with its user, for the tests.'''
+    # no password: hashing one is slow and the tests log in with force_login
+    user = User.objects.create_user(username=name)
+    return Profile.objects.create(first_name=name, last_name='Test', city='Boston',
+                                  email=f'{name}@example.com', user=user)
 
 # Create your tests here.
+class FriendTests(TestCase):
+    ''' Check friendships are stored once per pair and read back in a single query.'''
+
+    def setUp(self):
+        self.alice, self.bob, self.carol, self.dave = [make_profile(name) for name in ['alice', 'bob', 'carol', 'dave']]
+        # edges added from both ends, so alice is profile1 of one and profile2 of the other
+        self.alice.add_friend(self.bob)
+        self.carol.add_friend(self.alice)
+
+    def test_friends_in_one_query(self):
+        profile = Profile.objects.get(pk=self.alice.pk)
+        with self.assertNumQueries(1):
+            friends = profile.get_friends()
+            self.assertEqual({friend.pk for friend in friends}, {self.bob.pk, self.carol.pk})
+            # memoized for the rest of the request
+            profile.get_friends()
+
+    def test_duplicate_and_reversed_edges(self):
+        self.bob.add_friend(self.alice)
+        self.alice.add_friend(self.bob)
+        self.alice.add_friend(self.alice)
+        self.assertEqual(Friend.objects.count(), 2)
+
+    def test_add_friend_refreshes_friends(self):
+        self.assertEqual(len(self.dave.get_friends()), 0)
+        self.dave.add_friend(self.bob)
+        self.assertEqual(self.dave.get_friends(), [self.bob])
+
+    def test_reversed_edge_rejected_by_database(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Friend.objects.bulk_create([Friend(profile1=self.bob, profile2=self.alice)])
+
+
+class NewsFeedTests(TestCase):
+    ''' Check the timeline is written on post, friendship and delete, and read a page at a time.'''
+
+    def setUp(self):
+        self.alice, self.bob, self.carol = [make_profile(name) for name in ['alice', 'bob', 'carol']]
+        self.alice.add_friend(self.bob)
+
+    def post(self, profile, message, images=0):
+        ''' Post a status message with the given number of images.'''
+        status_message = StatusMessage.objects.create(profile=profile, message=message)
+        for i in range(images):
+            image = Image.objects.create(profile=profile, image_file=f'images/{message}-{i}.png')
+            StatusImage.objects.create(status_message=status_message, image_file=image)
+        return status_message
+
+    def test_post_fans_out_to_friends(self):
+        status_message = self.post(self.bob, 'hello')
+        self.assertEqual(list(self.alice.get_news_feed()), [status_message])
+        self.assertEqual(list(self.carol.get_news_feed()), [])
+
+    def test_new_friend_backfills_both_timelines(self):
+        old_post = self.post(self.carol, 'before')
+        self.post(self.alice, 'mine')
+        self.alice.add_friend(self.carol)
+        self.assertIn(old_post, self.alice.get_news_feed())
+        self.assertEqual(self.carol.get_news_feed().count(), 1)
+
+    def test_delete_removes_entries(self):
+        self.post(self.bob, 'oops').delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_feed_pages_in_constant_queries(self):
+        for i in range(25):
+            self.post(self.bob, f'post {i}', images=2)
+        self.client.force_login(self.alice.user)
+
+        # session, user, logged-in profile, timeline page, prefetched images
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('news_feed'))
+        self.assertContains(response, 'post 24')
+        self.assertNotContains(response, 'post 4</h2>')
+        self.assertContains(response, 'images/post%2024-1.png')
+
+        # the second page carries on where the first left off, in the same number of queries
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('news_feed') + '?' + response.context['page_obj'].next_query)
+        self.assertEqual([entry.status_message.message for entry in response.context['news_feed']],
+                         [f'post {i}' for i in range(4, -1, -1)])
+
+    def test_feed_names_its_owner(self):
+        self.client.force_login(self.alice.user)
+        response = self.client.get(reverse('news_feed'))
+        self.assertEqual(response.context['Profile'], self.alice)
+        self.assertIn('newest_post_pk', response.context)
+        self.assertContains(response, "Back to alice's Page")
+        self.assertNotContains(response, 'WARNING:')
+
+
+class ProfilePageTests(TestCase):
+    ''' Check a profile page costs the same number of queries however much it shows.'''
+
+    def setUp(self):
+        self.alice, self.bob = make_profile('alice'), make_profile('bob')
+        self.alice.add_friend(self.bob)
+
+    def post(self, count, images):
+        ''' Give alice count more status messages with the given number of images each.'''
+        for i in range(count):
+            status_message = StatusMessage.objects.create(profile=self.alice, message=f'post {i}')
+            for j in range(images):
+                image = Image.objects.create(profile=self.alice, image_file=f'images/{status_message.pk}-{j}.png')
+                StatusImage.objects.create(status_message=status_message, image_file=image)
+
+    def test_own_profile_queries_are_fixed(self):
+        self.client.force_login(self.alice.user)
+        url = reverse('show_profile')
+
+        # session, user, logged-in profile, page version, messages, images, friends
+        self.post(1, 1)
+        with self.assertNumQueries(7):
+            self.client.get(url)
+
+        self.post(30, 3)
+        with self.assertNumQueries(7):
+            response = self.client.get(url)
+        self.assertContains(response, "<img src='/media/images/", count=1 + 30 * 3)
+
+    def test_other_profile_queries_are_fixed(self):
+        self.post(20, 2)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('show_other_profile', args=[self.alice.pk]))
+        self.assertEqual(len(response.context['status_messages']), 20)
+
+    def test_unchanged_page_is_not_modified(self):
+        url = reverse('show_other_profile', args=[self.alice.pk])
+        etag = self.client.get(url)['ETag']
+
+        # only the page version is read before answering
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_changes_give_a_new_etag(self):
+        url = reverse('show_other_profile', args=[self.alice.pk])
+        etags = {self.client.get(url)['ETag']}
+        for change in [
+            lambda: self.post(1, 1),
+            lambda: Image.objects.filter(profile=self.alice).update(thumbnail='images/small.jpg'),
+            lambda: self.alice.add_friend(make_profile('carol')),
+            lambda: Profile.objects.filter(pk=self.alice.pk).update(city='Salem'),
+            # the page shows each friend's picture, so their changes count too
+            lambda: Profile.objects.filter(pk=self.bob.pk).update(image_url='https://example.com/bob.png'),
+            lambda: Profile.objects.filter(pk=self.bob.pk).update(first_name='Robert'),
+        ]:
+            change()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=', '.join(etags))
+            self.assertEqual(response.status_code, 200)
+            etags.add(response['ETag'])
+        self.assertEqual(len(etags), 7)
+
+
+class ProfileDirectoryTests(TestCase):
+    ''' Check the directory pages through profiles in name order and searches by index.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(60):
+            profile = make_profile(f'user{i:02}')
+            profile.first_name, profile.last_name = f'First{i:02}', 'Smith' if i % 2 else 'Jones'
+            profile.city = 'Boston' if i < 10 else 'Salem'
+            profile.save()
+
+    def names(self, response):
+        return [(profile.last_name, profile.first_name) for profile in response.context['Profiles']]
+
+    def test_pages_in_name_order(self):
+        first = self.client.get(reverse('show_all_profiles'))
+        second = self.client.get(reverse('show_all_profiles') + '?' + first.context['page_obj'].next_query)
+        names = self.names(first) + self.names(second)
+        self.assertEqual(len(self.names(first)), 50)
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(len(set(names)), 60)
+
+    def test_prefix_search(self):
+        response = self.client.get(reverse('show_all_profiles'), {'q': 'SMI'})
+        self.assertEqual(len(self.names(response)), 30)
+        self.assertTrue(all(last == 'Smith' for last, first in self.names(response)))
+
+        response = self.client.get(reverse('show_all_profiles'), {'q': 'first0', 'city': 'Boston'})
+        self.assertEqual(len(self.names(response)), 10)
+
+    def test_prefix_search_uses_name_indexes(self):
+        response = self.client.get(reverse('show_all_profiles'), {'q': 'smi'})
+        plan = response.context['view'].get_queryset().explain()
+        self.assertIn('profile_last_name_key_idx', plan)
+        self.assertIn('profile_first_name_key_idx', plan)
+
+    def test_non_ascii_prefix_search(self):
+        profile = make_profile('emile')
+        profile.first_name, profile.last_name = 'Émile', 'Ørsted'
+        profile.save()
+
+        for q in ['émi', 'ÉMI', 'ørs', 'ØRSTED']:
+            response = self.client.get(reverse('show_all_profiles'), {'q': q})
+            self.assertEqual(self.names(response), [('Ørsted', 'Émile')], q)
+
+    def test_prefix_ending_in_the_highest_code_point(self):
+        profile = make_profile('edge')
+        profile.last_name = 'Smi' + chr(sys.maxunicode) + 'th'
+        profile.save()
+
+        response = self.client.get(reverse('show_all_profiles'), {'q': 'smi' + chr(sys.maxunicode)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.names(response), [(profile.last_name, 'edge')])
+        self.assertEqual(prefix_range_end(chr(sys.maxunicode)), None)
+        self.assertEqual(prefix_range_end('a\ud7ff'), 'a\ue000')
+
+
+class LoggedInProfileTests(TestCase):
+    ''' Check the logged-in profile is looked up once per request, whichever view asks for it.'''
+
+    def setUp(self):
+        self.alice, self.bob = make_profile('alice'), make_profile('bob')
+        self.client.force_login(self.alice.user)
+
+    def test_one_lookup_per_page(self):
+        # session, user, logged-in profile
+        for name in ['create_status', 'update_profile']:
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.context['logged_in_profile'], self.alice)
+
+    def test_add_friend(self):
+        response = self.client.get(reverse('add_friend', args=[self.bob.pk]))
+        self.assertRedirects(response, reverse('show_other_profile', args=[self.bob.pk]), fetch_redirect_response=False)
+        self.assertEqual(self.alice.get_friends(), [self.bob])
+
+    def test_add_friend_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('add_friend', args=[self.bob.pk]))
+        self.assertRedirects(response, reverse('login') + '?next=' + reverse('add_friend', args=[self.bob.pk]),
+                             fetch_redirect_response=False)
+        self.assertFalse(Friend.objects.exists())
+
+
+class FriendSuggestionTests(TestCase):
+    ''' Check suggestions are ranked by mutual friends, topped up by city, bounded and cached.'''
+
+    def setUp(self):
+        cache.clear()
+        self.me, self.a, self.b, self.c, self.d = [make_profile(name) for name in ['me', 'a', 'b', 'c', 'd']]
+        self.me.add_friend(self.a)
+        self.me.add_friend(self.b)
+        # c shares two friends with me, d shares one
+        for friend in [self.a, self.b]:
+            friend.add_friend(self.c)
+        self.a.add_friend(self.d)
+        self.neighbour = make_profile('neighbour')
+        self.faraway = make_profile('faraway')
+        Profile.objects.filter(pk=self.faraway.pk).update(city='Chicago')
+
+    def test_ranked_by_mutual_friends_then_city(self):
+        suggestions = self.me.get_friend_suggestions()
+        self.assertEqual(suggestions, [self.c, self.d, self.neighbour])
+        self.assertEqual([profile.mutual_friends for profile in suggestions], [2, 1, 0])
+
+    def test_bounded(self):
+        for i in range(30):
+            make_profile(f'extra{i}')
+        self.assertEqual(len(self.me.get_friend_suggestions()), 20)
+
+    def test_cached_until_a_friend_makes_a_friend(self):
+        self.me.get_friend_suggestions()
+        profile = Profile.objects.get(pk=self.me.pk)
+        with self.assertNumQueries(1):
+            profile.get_friend_suggestions()
+
+        # a new friend of one of my friends is now a friend of a friend
+        newcomer = make_profile('newcomer')
+        Profile.objects.filter(pk=newcomer.pk).update(city='Chicago')
+        self.b.add_friend(newcomer)
+        self.assertIn(newcomer, self.me.get_friend_suggestions())
+
+
+class ThumbnailTests(TestCase):
+    ''' Check uploads get smaller variants in the background and the pages use them.'''
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.alice = make_profile('alice')
+
+    def upload(self, size, mode='RGB', image_format='JPEG', name='photo.jpg'):
+        ''' Post a status message with one generated picture, returning the Image saved for it.'''
+        buffer = io.BytesIO()
+        PILImage.new(mode, size, 'orange').save(buffer, image_format)
+        self.client.force_login(self.alice.user)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse('create_status'), {
+                'message': 'holiday', 'files': [SimpleUploadedFile(name, buffer.getvalue())],
+            })
+        # the variants are only scheduled once the upload is committed
+        self.assertEqual(len(callbacks), 1)
+        return Image.objects.get()
+
+    def test_post_without_pictures_schedules_nothing(self):
+        self.client.force_login(self.alice.user)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse('create_status'), {'message': 'no pictures today'})
+        self.assertEqual(StatusMessage.objects.count(), 1)
+        self.assertEqual(len(callbacks), 0)
+
+    def test_variants_made_after_upload(self):
+        image = self.upload((3000, 2000))
+        self.assertFalse(image.thumbnail)
+
+        # do the background job's work here rather than on the worker thread
+        make_variants(image)
+        image.refresh_from_db()
+        self.assertTrue(image.thumbnail.name.endswith('.thumb.jpg'))
+        self.assertTrue(image.thumbnail_webp.name.endswith('.thumb.webp'))
+        self.assertEqual((image.thumbnail.width, image.thumbnail.height), (800, 533))
+        self.assertLess(image.thumbnail_webp.size, image.image_file.size)
+
+        response = self.client.get(reverse('show_profile'))
+        self.assertContains(response, image.thumbnail_webp.url)
+        self.assertContains(response, image.thumbnail.url)
+
+    def test_transparent_fallback_is_png(self):
+        image = self.upload((100, 100), mode='RGBA', image_format='PNG', name='logo.png')
+        make_variants(image)
+        image.refresh_from_db()
+        self.assertTrue(image.thumbnail.name.endswith('.thumb.png'))
+
+    def test_unreadable_image_keeps_original(self):
+        image = Image.objects.create(profile=self.alice, image_file=SimpleUploadedFile('broken.jpg', b'not an image'))
+        with self.assertLogs('mini_fb.thumbnails', 'WARNING'):
+            make_variants(image)
+        image.refresh_from_db()
+        self.assertFalse(image.thumbnail)
+        self.assertEqual(image.get_display_url(), image.image_file.url)
+
+
+class StatusUploadTests(TestCase):
+    ''' Check a status message and its images are written together in a fixed number of queries.'''
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.alice = make_profile('alice')
+        self.alice.add_friend(make_profile('bob'))
+        self.client.force_login(self.alice.user)
+
+    def post(self, count):
+        ''' Post a status message with count small pictures.'''
+        files = []
+        for i in range(count):
+            buffer = io.BytesIO()
+            PILImage.new('RGB', (10, 10), 'blue').save(buffer, 'PNG')
+            files.append(SimpleUploadedFile(f'photo{i}.png', buffer.getvalue()))
+        return self.client.post(reverse('create_status'), {'message': 'album', 'files': files})
+
+    def test_queries_do_not_grow_with_files(self):
+        # session, user, profile, then savepoint, message, friends, timeline, images, links, release,
+        # then friends and images for the live feed event
+        with self.assertNumQueries(12):
+            self.post(1)
+        with self.assertNumQueries(12):
+            response = self.post(20)
+        self.assertRedirects(response, reverse('show_profile'), fetch_redirect_response=False)
+        self.assertEqual(StatusImage.objects.filter(status_message__message='album').count(), 21)
+        self.assertEqual(TimelineEntry.objects.count(), 2)
+
+    def test_failure_leaves_nothing_behind(self):
+        with mock.patch.object(StatusImage.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.post(3)
+        self.assertFalse(StatusMessage.objects.exists())
+        self.assertFalse(Image.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'images')), [])
+
+
+class RecordingBroker(InProcessBroker):
+    ''' Stand-in broker that also keeps every event it is asked to publish.'''
+
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    def publish(self, profile_pks, event):
+        self.published.append((sorted(profile_pks), event))
+        super().publish(profile_pks, event)
+
+
+@override_settings(MINI_FB_FEED_BROKER='mini_fb.tests.RecordingBroker')
+class LiveFeedTests(TestCase):
+    ''' Check new posts reach the open feeds of the author's friends, and only theirs.'''
+
+    def setUp(self):
+        self.alice, self.bob, self.carol = [make_profile(name) for name in ['alice', 'bob', 'carol']]
+        self.alice.add_friend(self.bob)
+        get_broker().published.clear()
+
+    def test_posting_publishes_to_friends(self):
+        self.client.force_login(self.bob.user)
+        self.client.post(reverse('create_status'), {'message': 'live from bob'})
+        [(profile_pks, event)] = get_broker().published
+        self.assertEqual(profile_pks, [self.alice.pk])
+        self.assertIn('live from bob', event['html'])
+
+    async def test_broker_delivers_across_threads(self):
+        broker = InProcessBroker()
+        subscription = broker.subscribe(self.alice.pk)
+        # status messages are posted from sync views, on other threads
+        thread = threading.Thread(target=broker.publish, args=([self.alice.pk, self.carol.pk], {'id': 1}))
+        thread.start()
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 5), {'id': 1})
+        thread.join()
+        broker.unsubscribe(subscription)
+        self.assertEqual(broker._subscriptions, {})
+
+    async def test_stream_catches_up_then_follows(self):
+        missed = await StatusMessage.objects.acreate(profile=self.bob, message='while away')
+        await self.async_client.aforce_login(self.alice.user)
+        response = await self.async_client.get(reverse('news_feed_events'), {'after': 0})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+
+        self.assertEqual(await anext(chunks), b'retry: 5000\n\n')
+        self.assertIn(f'id: {missed.pk}\n'.encode(), await anext(chunks))
+
+        # the subscription is open now, so a new post arrives on the stream
+        get_broker().publish([self.alice.pk], {'id': missed.pk + 1, 'html': '<p>new</p>'})
+        chunk = await asyncio.wait_for(anext(chunks), 5)
+        self.assertEqual(json.loads(chunk.decode().split('data: ')[1])['html'], '<p>new</p>')
+        await chunks.aclose()
+
+    async def test_stream_requires_login(self):
+        response = await self.async_client.get(reverse('news_feed_events'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_wsgi_feed_polls_instead_of_streaming(self):
+        missed = StatusMessage.objects.create(profile=self.bob, message='while away')
+        self.client.force_login(self.alice.user)
+        response = self.client.get(reverse('news_feed'))
+        self.assertFalse(response.context['live_stream'])
+        self.assertNotContains(response, 'EventSource')
+        self.assertContains(response, reverse('news_feed_updates'))
+
+        events = self.client.get(reverse('news_feed_updates'), {'after': 0}).json()['events']
+        self.assertEqual([event['id'] for event in events], [missed.pk])
+        self.assertEqual(self.client.get(reverse('news_feed_updates'), {'after': missed.pk}).json()['events'], [])
+
+    def test_stream_ends_at_once_under_wsgi(self):
+        missed = StatusMessage.objects.create(profile=self.bob, message='while away')
+        self.client.force_login(self.alice.user)
+        response = self.client.get(reverse('news_feed_events'), {'after': 0})
+        # the catch-up is sent and the response ends, without waiting for new posts
+        content = b''.join(response)
+        self.assertIn(f'id: {missed.pk}\n'.encode(), content)
+
+    async def test_asgi_feed_streams(self):
+        await self.async_client.aforce_login(self.alice.user)
+        response = await self.async_client.get(reverse('news_feed'))
+        self.assertTrue(response.context['live_stream'])
+
+
+class FriendImportTests(TestCase):
+    ''' Check friendships added in bulk are normalized, de-duplicated and summarized.'''
+
+    def setUp(self):
+        cache.clear()
+        self.profiles = [make_profile(f'user{i}') for i in range(6)]
+        self.pks = [profile.pk for profile in self.profiles]
+
+    def test_add_pairs(self):
+        a, b, c, d = self.pks[:4]
+        self.profiles[0].add_friend(self.profiles[1])
+        StatusMessage.objects.create(profile=self.profiles[2], message='hi from c')
+        created = Friend.add_pairs([(b, a), (c, a), (a, c), (d, d), (d, c)])
+        self.assertEqual(created, 2)
+        self.assertEqual(set(Friend.objects.values_list('profile1', 'profile2')), {(a, b), (a, c), (c, d)})
+        # c's post reaches the timelines of its new friends
+        self.assertEqual(TimelineEntry.objects.filter(status_message__message='hi from c').count(), 2)
+
+    def test_add_pairs_skips_existing_friendships(self):
+        a, b, c = self.pks[:3]
+        self.profiles[0].add_friend(self.profiles[1])
+        StatusMessage.objects.create(profile=self.profiles[0], message='hi from a')
+        TimelineEntry.objects.all().delete()
+
+        # only the new pair fans out to timelines; no table is counted
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Friend.add_pairs([(a, b), (b, c)]), 1)
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+        self.assertEqual(TimelineEntry.objects.count(), 0)
+
+        self.assertEqual(Friend.add_pairs([(a, b), (c, b)]), 0)
+
+    def test_add_pairs_clears_suggestions(self):
+        a, b, c = self.pks[:3]
+        self.profiles[0].add_friend(self.profiles[1])
+        # c is suggested from the same city at first, then as a friend of a friend
+        [suggestion] = [profile for profile in self.profiles[0].get_friend_suggestions() if profile.pk == c]
+        self.assertEqual(suggestion.mutual_friends, 0)
+        Friend.add_pairs([(b, c)])
+        suggestion = Profile.objects.get(pk=a).get_friend_suggestions()[0]
+        self.assertEqual((suggestion.pk, suggestion.mutual_friends), (c, 1))
+
+    def test_graph_stats(self):
+        # a triangle, a path of three and an edge
+        stats = graph_stats([(1, 2), (2, 3), (1, 3), (4, 5), (5, 6), (7, 8)])
+        self.assertEqual((stats['profiles'], stats['friendships']), (8, 6))
+        self.assertEqual((stats['components'], stats['largest_component']), (3, 3))
+        self.assertEqual(stats['degrees'], {2: 4, 1: 4})
+
+    def test_command(self):
+        a, b, c, d = self.pks[:4]
+        rows = ['a,b', f'{a},{b}', f'{b},{a}', f'{c},{d}', f'{c},{c}', f'{a},999999', 'x,y']
+        path = os.path.join(tempfile.mkdtemp(), 'friends.csv')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write('\n'.join(rows) + '\n')
+
+        out = io.StringIO()
+        call_command('load_friends', path, stdout=out)
+        self.assertEqual(Friend.objects.count(), 2)
+        self.assertIn('Created 2 friendships (1 repeated in the file, 0 already friends)', out.getvalue())
+        self.assertIn('2 friendships between 4 profiles (2 without friends), in 2 components', out.getvalue())
+        self.assertIn('Degree distribution: 1: 4', out.getvalue())
+        self.assertIn('Skipped 3 records', out.getvalue())
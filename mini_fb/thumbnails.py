@@ -0,0 +1,89 @@
+# File: thumbnails.py
+# Author: A'Yanna Rouse (yanni620@bu.edu), 10/18/2026
+# Description: Build the resized JPEG/PNG and WebP variants of uploaded images, off the request thread.
+
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image as PILImage, ImageOps, UnidentifiedImageError
+
+from .models import Image
+
+logger = logging.getLogger(__name__)
+
+# largest width and height of a variant; pages never show an image wider than this
+THUMBNAIL_SIZE = (800, 800)
+THUMBNAIL_QUALITY = 80
+
+# started on the first upload, so importing this module costs nothing
+_executor = None
+
+
+def make_variants(image):
+    '''
+    Write the resized and WebP variants of one Image next to its original and record them on the row.
+    Images that cannot be read are logged and left to be shown at full size.
+    '''
+    name = image.image_file.name
+    storage = image.image_file.storage
+    try:
+        with storage.open(name, 'rb') as f, PILImage.open(f) as original:
+            # apply the camera's rotation before the EXIF data is dropped
+            picture = ImageOps.exif_transpose(original)
+            picture.thumbnail(THUMBNAIL_SIZE)
+            picture.load()
+    except (OSError, UnidentifiedImageError) as e:
+        logger.warning('Cannot make variants of %s: %s', name, e)
+        return
+
+    # keep transparency in the fallback, which JPEG cannot hold
+    has_alpha = picture.mode in ('RGBA', 'LA', 'PA') or 'transparency' in picture.info
+    picture = picture.convert('RGBA' if has_alpha else 'RGB')
+    stem = os.path.splitext(name)[0]
+
+    # a variant no smaller than the original is not worth serving: the resized image
+    # falls back to the original itself, and the WebP source is left out
+    original_size = storage.size(name)
+    variants = {'thumbnail': name, 'thumbnail_webp': ''}
+    for field, extension, image_format in [
+        ('thumbnail', 'png' if has_alpha else 'jpg', 'PNG' if has_alpha else 'JPEG'),
+        ('thumbnail_webp', 'webp', 'WEBP'),
+    ]:
+        buffer = io.BytesIO()
+        picture.save(buffer, image_format, quality=THUMBNAIL_QUALITY, optimize=True)
+        if buffer.tell() < original_size:
+            variants[field] = storage.save(f'{stem}.thumb.{extension}', ContentFile(buffer.getvalue()))
+
+    Image.objects.filter(pk=image.pk).update(**variants)
+
+
+def make_all_variants(image_pks):
+    ''' Make the variants of every Image in image_pks. Run on a worker thread.'''
+    try:
+        for image in Image.objects.filter(pk__in=image_pks):
+            make_variants(image)
+    except Exception:
+        logger.exception('Making image variants failed for %s', image_pks)
+    finally:
+        # this thread's connections would otherwise stay open until it exits
+        connections.close_all()
+
+
+def schedule_variants(image_pks):
+    ''' Make the variants of these Images in the background, once the upload has been committed.'''
+    image_pks = list(image_pks)
+    if not image_pks:
+        # a status message without pictures starts no job and no worker thread
+        return
+
+    def submit():
+        global _executor
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='mini_fb-thumbnails')
+        _executor.submit(make_all_variants, image_pks)
+
+    transaction.on_commit(submit)
@@ -20,6 +20,8 @@ urlpatterns = [
     path('Profile/add_friend/<int:other_pk>', AddFriendView.as_view(), name='add_friend'),
     path('Profile/friend_suggestions', ShowFriendSuggestionsView.as_view(), name='friend_suggestions'),
     path('Profile/news_feed', ShowNewsFeedView.as_view(), name='news_feed'),
+    path('Profile/news_feed/events', NewsFeedEventsView.as_view(), name='news_feed_events'),
+    path('Profile/news_feed/updates', NewsFeedUpdatesView.as_view(), name='news_feed_updates'),
     #authorization-related URLs:
     path('login/', auth_views.LoginView.as_view(template_name='mini_fb/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(template_name='mini_fb/logged_out.html'), name='logout'), 
@@ -2,9 +2,10 @@
 # Author: A'Yanna Rouse (yanni620@bu.edu), 02/20/2025
 # Description: These are for the views for the mini_fb app, to show the profiles.
 from django.shortcuts import get_object_or_404, redirect # type: ignore
+from django.http import Http404 # type: ignore
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, View # type: ignore
 from .forms import CreateProfileForm, CreateStatusMessageForm, UpdateProfileForm
-from .models import Profile, StatusMessage, Image, StatusImage
+from .models import Profile, StatusMessage, Image, StatusImage, TimelineEntry
 from django.urls import reverse # type: ignore
 from django.shortcuts import redirect # type: ignore
 from django.contrib.auth.mixins import LoginRequiredMixin # for authorization # type: ignore
@@ -12,42 +13,104 @@ from django.contrib.auth.forms import UserCreationForm # the Django user model #
 from django.contrib.auth.models import User # the Django user model # type: ignore
 from django.contrib.auth import login # type: ignore
 from django.views.generic.base import ContextMixin # type: ignore
+from django.db import transaction # type: ignore
+from django.db.models import Q # type: ignore
+from cs412.caching import ConditionalGetMixin
+from cs412.pagination import KeysetPaginationMixin
+from .thumbnails import schedule_variants
+from .feed_events import get_broker, get_missed_events, format_event, publish_status_message
+from asgiref.sync import sync_to_async # type: ignore
+from django.http import StreamingHttpResponse, HttpResponseForbidden, JsonResponse # type: ignore
+from django.core.handlers.asgi import ASGIRequest # type: ignore
+import asyncio
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+# a live feed stream sends a comment this often to keep proxies from closing it,
+# and ends after a while so the browser reconnects to a fresh one
+FEED_KEEPALIVE_SECONDS = 15
+FEED_STREAM_SECONDS = 5 * 60
+
+# under WSGI the feed polls for new posts this often instead of holding a stream open
+FEED_POLL_SECONDS = 15
+
+
+def prefix_range_end(prefix):
+    ''' Return the smallest string above every string starting with prefix, or None if there is none.'''
+    # the highest code point cannot be raised, so raise the character before it instead
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    code = ord(prefix[-1]) + 1
+    # surrogates cannot be encoded for the database; skip over them
+    if 0xD800 <= code <= 0xDFFF:
+        code = 0xE000
+    return prefix[:-1] + chr(code)
+
 
 # Create your views here.
 
 class LoggedInUserProfileMixin(ContextMixin):
     """
     A mixin to add the logged-in user's profile to the context.
+    The profile is looked up at most once per request and shared by everything that asks for it.
     """
+    def get_logged_in_profile(self):
+        ''' Return the logged-in user's Profile, or None if nobody is logged in. '''
+        if not hasattr(self.request, '_mini_fb_profile'):
+            profile = None
+            if self.request.user.is_authenticated:
+                profile = get_object_or_404(Profile, user=self.request.user)
+                # the authentication middleware has already loaded the user
+                profile.user = self.request.user
+            self.request._mini_fb_profile = profile
+        return self.request._mini_fb_profile
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if self.request.user.is_authenticated:
-            # Get the logged-in user's profile
-            context['logged_in_profile'] = get_object_or_404(Profile, user=self.request.user)
-        else:
-            context['logged_in_profile'] = None
+        context['logged_in_profile'] = self.get_logged_in_profile()
         return context
     
 # Public Views (no login required)
-class ShowAllProfilesView(LoggedInUserProfileMixin, ListView):
-    ''' Define a view class to show all profiles. '''
+class ShowAllProfilesView(LoggedInUserProfileMixin, KeysetPaginationMixin, ListView):
+    ''' Define a view class to show all profiles, a page at a time, optionally searched by name or city. '''
 
-    # Defines the model, template, and context object name for the all profiles page
+    # Defines the model, template, context object name and page size for the all profiles page
     model = Profile
     template_name = "mini_fb/show_all_profiles.html"
     context_object_name = "Profiles"
+    paginate_by = 50
+    keyset_fields = ('last_name', 'first_name', 'pk')
 
-    def dispatch(self, request, *args, **kwargs):
-        '''Override the dispatch method to add debugging information.'''
+    def get_queryset(self):
+        ''' Return the profiles matching the ?q= name prefix and ?city=, if given. '''
+        profiles = Profile.objects.all()
 
-        if request.user.is_authenticated:
-            print(f'ShowAllProfilesView.dispatch(): request.user={request.user}')
-        else:
-            print(f'ShowAllProfilesView.dispatch(): not logged in.')
+        # a range on the casefolded names, which their indexes answer, rather than a scanning icontains
+        prefix = self.request.GET.get('q', '').strip().casefold()
+        if prefix:
+            end = prefix_range_end(prefix)
+            last = Q(last_name_key__gte=prefix) & (Q(last_name_key__lt=end) if end else Q())
+            first = Q(first_name_key__gte=prefix) & (Q(first_name_key__lt=end) if end else Q())
+            profiles = profiles.filter(last | first)
 
-        return super().dispatch(request, *args, **kwargs)
+        city = self.request.GET.get('city', '').strip()
+        if city:
+            profiles = profiles.filter(city=city)
+
+        logger.debug('profile directory: user=%s q=%r city=%r', self.request.user, prefix, city)
+        return profiles
+
+    def get_context_data(self, **kwargs):
+        ''' Add the search terms to the context, to refill the search form. '''
+        context = super().get_context_data(**kwargs)
+        context['q'] = self.request.GET.get('q', '')
+        context['city'] = self.request.GET.get('city', '')
+        return context
 
-class ShowProfilePageView(LoggedInUserProfileMixin, DetailView):
+class ShowProfilePageView(LoggedInUserProfileMixin, ConditionalGetMixin, DetailView):
     ''' Define a view class to show all profiles. '''
 
     # Defines the model, template, and context object name for the singular profile page
@@ -55,12 +118,34 @@ class ShowProfilePageView(LoggedInUserProfileMixin, DetailView):
     template_name = "mini_fb/show_profile.html"
     context_object_name = "Profile"
 
+    def get_freshness(self):
+        ''' Return the version of the profile page for its ETag; no single timestamp covers every change to it. '''
+        pk = self.kwargs.get('pk')
+        if pk is None:
+            profile = self.get_logged_in_profile()
+            if profile is None:
+                return None
+            pk = profile.pk
+        version = Profile.get_page_version(pk)
+        if version is None:
+            return None
+        return version, None
+
     def get_object(self):
         ''' Fetch the Profile object dynamically. '''
         pk = self.kwargs.get('pk')  # Get `pk` from the URL if it exists
         if pk:
-            return get_object_or_404(Profile, pk=pk)
-        return get_object_or_404(Profile, user=self.request.user)
+            return get_object_or_404(Profile.objects.select_related('user'), pk=pk)
+        profile = self.get_logged_in_profile()
+        if profile is None:
+            raise Http404('Log in to see your profile.')
+        return profile
+
+    def get_context_data(self, **kwargs):
+        ''' Add the profile's status messages, with their images, to the context. '''
+        context = super().get_context_data(**kwargs)
+        context['status_messages'] = self.object.get_status_messages()
+        return context
 
 class CreateProfileView(LoggedInUserProfileMixin, CreateView):
     ''' A view to handle creation of a new Profile.
@@ -111,11 +196,8 @@ class CreateStatusMessageView(LoginRequiredMixin, LoggedInUserProfileMixin, Crea
         # calling the superclass method
         context = super().get_context_data(**kwargs)
 
-        # find the profile for the logged-in user
-        profile = get_object_or_404(Profile, user=self.request.user)
-
-        # add this article into the context dictionary
-        context['Profile'] = profile
+        # add the logged-in user's profile into the context dictionary
+        context['Profile'] = self.get_logged_in_profile()
         return context
     
     def form_valid(self, form):
@@ -125,27 +207,40 @@ class CreateStatusMessageView(LoginRequiredMixin, LoggedInUserProfileMixin, Crea
         '''
 
         # find the profile for the logged-in user
-        profile = get_object_or_404(Profile, user=self.request.user)
+        profile = self.get_logged_in_profile()
 
         # attach the article to the comment
         form.instance.profile = profile # set the FK
 
-        # save the status message to database
-        sm = form.save()
-
-        # read the file from the form:
-        files = self.request.FILES.getlist('files')
-        for file in files:
-            # create an Image object and save it
-            image = Image(image_file=file, profile=profile)
-            image.save()
-
-            # create and save a StatusImage object
-            status_image = StatusImage(status_message=sm, image_file=image)
-            status_image.save()
-
-        # delegate the work to the superclass methom form_valid:
-        return super().form_valid(form)
+        # write the uploaded files to storage first, so the transaction below holds only database work;
+        # storage copies each upload in chunks instead of reading it into memory
+        images = []
+        for file in self.request.FILES.getlist('files'):
+            image = Image(profile=profile)
+            image.image_file.save(file.name, file, save=False)
+            images.append(image)
+
+        # save the status message, its Images and their StatusImage links together, or not at all
+        try:
+            with transaction.atomic():
+                sm = form.save()
+                Image.objects.bulk_create(images)
+                StatusImage.objects.bulk_create([StatusImage(status_message=sm, image_file=image) for image in images])
+        except Exception:
+            # don't leave files behind for rows that were never written
+            for image in images:
+                image.image_file.delete(save=False)
+            raise
+
+        # resize the uploads after the response has gone, rather than making the user wait
+        schedule_variants(image.pk for image in images)
+
+        # show the post straight away on the news feeds friends have open
+        publish_status_message(sm)
+
+        # the status message is saved, so go straight to the success page
+        self.object = sm
+        return redirect(self.get_success_url())
     
     def get_success_url(self):
         ''' Provide a URL to redirect to after creating a new comment.'''
@@ -162,7 +257,7 @@ class UpdateProfileView(LoginRequiredMixin, LoggedInUserProfileMixin, UpdateView
 
     def get_object(self):
         ''' Fetch the Profile object for the logged-in user. '''
-        return get_object_or_404(Profile, user=self.request.user)
+        return self.get_logged_in_profile()
     
     def get_login_url(self) -> str:
         '''return the URL required for login'''
@@ -224,21 +319,21 @@ class AddFriendView(LoginRequiredMixin, LoggedInUserProfileMixin, View):
         '''return the URL required for login'''
         return reverse('login')
     
-    def dispatch(self, request, *args, **kwargs):
+    def get(self, request, *args, **kwargs):
         ''' Handle the request to add a friend. '''
 
         # retrieve the PKs from the URL pattern
         friend_pk = self.kwargs['other_pk']
 
         # find the logged-in user's profile and the friend's profile
-        profile = get_object_or_404(Profile, user=self.request.user)
+        profile = self.get_logged_in_profile()
         friend = get_object_or_404(Profile, pk=friend_pk)
 
         # add the friend to the profile
         profile.add_friend(friend)
 
         # redirect to the profile page
-        return redirect('show_profile', pk=friend_pk)
+        return redirect('show_other_profile', pk=friend_pk)
     
 class ShowFriendSuggestionsView(LoginRequiredMixin, LoggedInUserProfileMixin, DetailView):
     ''' Defines a view class to show friend suggestions. '''
@@ -251,17 +346,101 @@ class ShowFriendSuggestionsView(LoginRequiredMixin, LoggedInUserProfileMixin, De
 
     def get_object(self):
         ''' Fetch the Profile object for the logged-in user. '''
-        return get_object_or_404(Profile, user=self.request.user)
+        return self.get_logged_in_profile()
 
-class ShowNewsFeedView(LoginRequiredMixin, LoggedInUserProfileMixin, DetailView):
+class ShowNewsFeedView(LoginRequiredMixin, LoggedInUserProfileMixin, KeysetPaginationMixin, ListView):
     ''' Defines a view class to show news feeds. '''
 
-    # Defines the model, template, and context object name for the singular profile page
+    # Defines the template, context object name and page size for the news feed page
     login_url = '/mini_fb/login/'
-    model = Profile
     template_name = "mini_fb/news_feed.html"
-    context_object_name = "Profile"
+    context_object_name = "news_feed"
+    paginate_by = 20
+    keyset_fields = ('-timestamp', '-pk')
+
+    def get_queryset(self):
+        ''' Return the logged-in profile's timeline, with each post's author and images fetched alongside. '''
+        self.profile = self.get_logged_in_profile()
+        return (TimelineEntry.objects
+                .filter(profile=self.profile)
+                .select_related('status_message__profile')
+                .prefetch_related(StatusMessage.prefetch_images('status_message__')))
 
-    def get_object(self):
-        ''' Fetch the Profile object for the logged-in user. '''
-        return get_object_or_404(Profile, user=self.request.user)
\ No newline at end of file
+    def get_context_data(self, **kwargs):
+        ''' Add the logged-in profile, and the newest post shown for the live updates to carry on from, to the context. '''
+        context = super().get_context_data(**kwargs)
+        context['Profile'] = self.profile
+        # a held-open stream only suits an ASGI server; a WSGI worker would be tied up by it
+        context['live_stream'] = isinstance(self.request, ASGIRequest)
+        context['poll_seconds'] = FEED_POLL_SECONDS
+        context['newest_post_pk'] = max((entry.status_message_id for entry in context['news_feed']), default=0)
+        return context
+
+def read_after(request):
+    ''' Return the pk of the newest post a feed has already shown, from the request. '''
+    # a reconnecting browser says what it saw last; a fresh page says what it rendered
+    after = request.headers.get('Last-Event-ID') or request.GET.get('after') or 0
+    try:
+        return int(after)
+    except ValueError:
+        return 0
+
+class NewsFeedUpdatesView(LoginRequiredMixin, LoggedInUserProfileMixin, View):
+    '''
+    Return the posts newer than ?after= on the logged-in user's timeline as JSON.
+    The news feed polls this when the site runs under WSGI, where a held-open stream
+    would keep a worker busy for as long as the page is open.
+    '''
+
+    def get(self, request):
+        ''' Return the missed events, oldest first. '''
+        profile = self.get_logged_in_profile()
+        if profile is None:
+            return HttpResponseForbidden()
+        return JsonResponse({'events': get_missed_events(profile.pk, read_after(request))})
+
+class NewsFeedEventsView(View):
+    '''
+    Stream new posts from friends to an open news feed as Server-Sent Events.
+    This is an async view: under ASGI (cs412/asgi.py) each open feed costs a waiting
+    coroutine rather than a worker thread. Under WSGI it only sends the missed posts
+    and ends, so it never holds a worker; the feed page polls NewsFeedUpdatesView there instead.
+    '''
+
+    async def get(self, request):
+        ''' Start the event stream for the logged-in user's feed. '''
+        user = await request.auser()
+        if not user.is_authenticated:
+            return HttpResponseForbidden()
+        profile_pk = await Profile.objects.filter(user=user).values_list('pk', flat=True).afirst()
+        if profile_pk is None:
+            return HttpResponseForbidden()
+
+        seconds = FEED_STREAM_SECONDS if isinstance(request, ASGIRequest) else 0
+        response = StreamingHttpResponse(self.stream(profile_pk, read_after(request), seconds),
+                                         content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, profile_pk, after, seconds=FEED_STREAM_SECONDS):
+        ''' Yield the posts missed since after, then each new post published in the next seconds. '''
+        broker = get_broker()
+        # subscribe before catching up, so nothing posted in between is lost
+        subscription = broker.subscribe(profile_pk)
+        try:
+            yield 'retry: 5000\n\n'
+            for event in await sync_to_async(get_missed_events)(profile_pk, after):
+                yield format_event(event)
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + seconds
+            while loop.time() < deadline:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), FEED_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_event(event)
+        finally:
+            broker.unsubscribe(subscription)
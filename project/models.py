@@ -4,6 +4,9 @@
 
 from django.db import models #type: ignore
 from django.contrib.auth.models import User as AuthUser # type: ignore
+from django.db.models.signals import m2m_changed, post_save, pre_delete # type: ignore
+from django.dispatch import receiver # type: ignore
+from django.utils import timezone # type: ignore
 
 # Create your models here.
 class Tag(models.Model):
@@ -48,6 +51,8 @@ class Profile(models.Model):
     photo = models.ImageField(upload_to='profiles/', blank=True, null=True)
     featured_works = models.ManyToManyField(Work, blank=True)
     date_added = models.DateField(auto_now_add=True)
+    # when anything shown on the profile page last changed, including its works, tags and bookmarks
+    updated = models.DateTimeField(auto_now=True)
     tags = models.ManyToManyField(Tag, blank=True)
     created_creator_by = models.ForeignKey(AuthUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='created_profiles')
 
@@ -110,3 +115,31 @@ class WorkSubmission(models.Model):
     def __str__(self):
         return f"{self.title} for {self.creator.name}"
 
+
+def touch_profiles(pks):
+    ''' Mark the profiles with these pks as changed, for their pages' ETag and Last-Modified.'''
+    Profile.objects.filter(pk__in=pks).update(updated=timezone.now())
+
+
+@receiver(m2m_changed, sender=Profile.featured_works.through)
+@receiver(m2m_changed, sender=Profile.tags.through)
+@receiver(m2m_changed, sender=UserProfile.bookmarked_profiles.through)
+def profile_links_changed(sender, instance, action, pk_set, **kwargs):
+    ''' Touch the profiles whose works, tags or bookmarks were added or removed, from either side.'''
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if isinstance(instance, Profile):
+        touch_profiles([instance.pk])
+    elif pk_set is not None:
+        touch_profiles(pk_set)
+    else:
+        # clearing from the other side: the profiles it is linked to, before the links go
+        touch_profiles(sender.objects.filter(**{instance._meta.model_name: instance}).values('profile'))
+
+
+@receiver([post_save, pre_delete], sender=Work)
+@receiver([post_save, pre_delete], sender=Tag)
+def profile_content_changed(sender, instance, **kwargs):
+    ''' Touch the profiles showing a work or tag that was edited or is being deleted.'''
+    related = 'featured_works' if sender is Work else 'tags'
+    touch_profiles(Profile.objects.filter(**{related: instance}).values('pk'))
@@ -1,3 +1,90 @@
-from django.test import TestCase
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .models import Profile, Tag, UserProfile, Work
+
+# libraries that must only be imported by the views that use them
+HEAVY_MODULES = ['plotly', 'google.generativeai', 'numpy', 'pandas']
+
+# total import time allowed for a WSGI worker to load the project and its URLconf
+IMPORT_BUDGET_SECONDS = 1.5
 
 # Create your tests here.
+class StartupImportTests(SimpleTestCase):
+    ''' Guard the cost of booting a WSGI worker, measured with python -X importtime.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # import what a worker loads before serving its first request, in a fresh interpreter
+        script = ('import sys, cs412.wsgi, cs412.urls; '
+                  f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))')
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='cs412.settings')
+        cls.result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script],
+                                    cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+
+    def test_worker_starts(self):
+        self.assertEqual(self.result.returncode, 0, self.result.stderr)
+
+    def test_heavy_modules_are_deferred(self):
+        self.assertEqual(self.result.stdout.strip(), '')
+
+    def test_import_time_budget(self):
+        # each line reads "import time: <self us> | <cumulative us> | <module>"
+        total = 0
+        for line in self.result.stderr.splitlines():
+            if line.startswith('import time:') and 'self [us]' not in line:
+                total += int(line.split('|')[0].split(':')[1])
+        self.assertLess(total / 1e6, IMPORT_BUDGET_SECONDS)
+
+
+class ProfileDetailConditionalTests(TestCase):
+    ''' A revisited, unchanged creator profile is answered with 304 Not Modified.'''
+
+    def setUp(self):
+        self.profile = Profile.objects.create(name='Creator', profile_type='Streamer', nationality='US', bio='Bio')
+        self.url = reverse('profile_detail', args=[self.profile.pk])
+
+    def test_unchanged_profile_is_not_modified(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_give_a_new_etag(self):
+        work = Work.objects.create(title='Game', platform='PC', description='A game', type='Game', link='https://example.com')
+        tag = Tag.objects.create(name='Indie')
+        user_profile = UserProfile.objects.create(user=User.objects.create(username='fan'))
+
+        etags = {self.client.get(self.url)['ETag']}
+        for change in [
+            lambda: self.profile.featured_works.add(work),
+            lambda: Work.objects.get(pk=work.pk).save(),
+            lambda: tag.profile_set.add(self.profile),
+            lambda: user_profile.bookmarked_profiles.add(self.profile),
+            lambda: tag.delete(),
+            lambda: Profile.objects.get(pk=self.profile.pk).save(),
+        ]:
+            change()
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=', '.join(etags))
+            self.assertEqual(response.status_code, 200)
+            etags.add(response['ETag'])
+        self.assertEqual(len(etags), 7)
+
+    def test_staff_status_changes_the_etag(self):
+        user = User.objects.create(username='editor')
+        self.client.force_login(user)
+        etag = self.client.get(self.url)['ETag']
+
+        User.objects.filter(pk=user.pk).update(is_staff=True)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
@@ -13,12 +13,12 @@ from django.contrib.auth.forms import UserCreationForm
 from django.urls import reverse_lazy
 from .models import *
 from .forms import *
-import google.generativeai as genai
 from django.conf import settings
 from django.http import HttpResponseRedirect
 from django.urls import reverse
 from django.db.models import Q
 from django.views import View
+from cs412.caching import ConditionalGetMixin
 import re
 
 class HomeView(TemplateView):
@@ -31,11 +31,19 @@ class ProfileListView(ListView):
     context_object_name = 'profiles'
 
 
-class ProfileDetailView(DetailView):
+class ProfileDetailView(ConditionalGetMixin, DetailView):
     model = Profile
     template_name = 'project/profile_detail.html'
     context_object_name = 'profile'
 
+    def get_freshness(self):
+        '''return the version and last change of the profile page, read from its updated column'''
+        updated = Profile.objects.filter(pk=self.kwargs['pk']).values_list('updated', flat=True).first()
+        if updated is None:
+            return None
+        # staff see edit links on every profile, so gaining or losing staff status changes the page
+        return f'{updated.isoformat()}:{self.request.user.is_staff}', updated
+
 class CreateProfileView(LoginRequiredMixin, FormView):
     template_name = 'project/create_profile.html'
     form_class = SubmissionForm
@@ -126,7 +134,8 @@ class GeminiChatbotView(TemplateView):
         context['ai_response'] = None
 
         if query:
-            # Step 1: Configure Gemini
+            # Step 1: Configure Gemini (imported here, as the client library is slow to import)
+            import google.generativeai as genai
             genai.configure(api_key=settings.GOOGLE_API_KEY)
             model = genai.GenerativeModel("gemini-1.5-flash-002")
 
@@ -1,6 +1,10 @@
 from django.shortcuts import render
+from cs412.caching import cache_anonymous_page
 import random
 
+# seconds a rendered page of the fixed quotes and images is reused
+PAGE_CACHE_TIMEOUT = 60 * 60
+
 quotes = ["Don't allow anybody to project any stereotypes on you that tell you that you can't be here—that you're too dark, that you're not smart enough, that you're too dramatic or too loud, she said. You are exactly who you need to be, to be right where you are, and I am a testimony.", 
           "However you want to define me, make the comparisons, but I'm going to continue to push and challenge what 'genre' means and what it is. I think music challenges that.",
           "I want to open as many doors as possible.",
@@ -30,6 +34,7 @@ def quote_page(request):
 def about_page(request):
     return render(request, "quotes/about.html")
 
+@cache_anonymous_page(PAGE_CACHE_TIMEOUT, 'quotes')
 def show_all_page(request):
     context = {"quotes": quotes, "images": images}
     return render(request, "quotes/show_all.html", context)
@@ -2,8 +2,12 @@
 # Author: A'Yanna Rouse (yanni620@bu.edu), 02/11/2025
 # Description: This is the confirmation page after the user submits the order form.
 from django.shortcuts import render
+from cs412.caching import cache_anonymous_page
 import random
 
+# seconds a rendered static page is reused
+PAGE_CACHE_TIMEOUT = 60 * 60
+
 # List of special dishes with their names and prices
 specials = [ {"name": "Errol's Thai Fried Rice w/ Jerk Pork", "price": 14.95}, {"name": "Jerk Chicken Flatbread", "price": 17.00}, 
             {"name": "Ackee and Saltfish Flatbread", "price": 19.00}, {"name": "Honey Garlic Tenders Flatbread", "price": 22.50}, 
@@ -15,6 +19,7 @@ specials = [ {"name": "Errol's Thai Fried Rice w/ Jerk Pork", "price": 14.95}, {
             {"name": "Rasta Pasta w/ Sliced Snapper (steak)", "price": 24.00}]
 
 # Create your views here.
+@cache_anonymous_page(PAGE_CACHE_TIMEOUT, 'restaurant')
 def main_page(request):
     """ Render the main page of the application. """
     return render(request, "restaurant/main.html")
@@ -0,0 +1,107 @@
+# File: load_voters.py
+# Author: A'Yanna Rouse (yanni620@bu.edu), 10/18/2026
+# Description: Management command to bulk load the Newton voter CSV file into the Voter model.
+
+from django.db import transaction
+
+from cs412.csv_import import CSVImportCommand, read_batches
+from voter_analytics.models import Voter
+from voter_analytics.stats import clear_graph_summaries
+
+# columns compared between the file and the table when syncing by voter_id
+SYNC_FIELDS = [field.name for field in Voter._meta.concrete_fields
+               if not field.primary_key and field.name != 'voter_id']
+
+
+class Command(CSVImportCommand):
+    help = 'Load voter records from a CSV file (or stdin) into the Voter table using batched bulk inserts.'
+
+    rejects_name = 'voters'
+
+    def add_arguments(self, parser):
+        ''' Define the command line arguments.'''
+        super().add_arguments(parser)
+        parser.add_argument('--sync', action='store_true',
+                            help='insert, update and delete only the voters that changed, matched by voter_id, '
+                                 'instead of replacing the whole table')
+
+    def finish(self, options):
+        ''' The precomputed graph series no longer match the table.'''
+        clear_graph_summaries()
+
+    def load(self, reader, batch_size, rejects, options):
+        ''' Replace the Voter table with the rows from reader, or sync it with --sync.
+        Return the number of rows read and a summary of the changes.
+        '''
+        if options['sync']:
+            return self.sync(reader, batch_size, rejects)
+
+        # replace the table in one transaction, so readers never see it empty or half loaded
+        with transaction.atomic():
+            # delete existing records to prevent duplicates:
+            Voter.objects.all().delete()
+
+            created = self.bulk_insert(reader, batch_size, rejects, Voter.from_csv_row)
+        return created, f'Created {created} voters'
+
+    def sync(self, reader, batch_size, rejects):
+        ''' Bring the Voter table in line with the rows from reader, matching rows by voter_id.
+        Only new, changed and removed voters are written, all in one transaction, so readers
+        see either the old table or the new one and never a partial load. A voter whose row
+        is rejected is left unchanged rather than deleted.
+        Return the number of rows read and a summary of the changes.
+        '''
+
+        # voter_id -> (pk, values) for every voter currently in the table
+        existing = {}
+        to_delete = []
+        for pk, voter_id, *values in Voter.objects.values_list('pk', 'voter_id', *SYNC_FIELDS).iterator():
+            if voter_id in existing:
+                # only one row per voter_id survives a sync
+                to_delete.append(pk)
+            else:
+                existing[voter_id] = (pk, tuple(values))
+
+        to_create = []
+        to_update = []
+        seen = set()
+        # voters whose rows were rejected: still in the file, so left as they are
+        keep = set()
+        rows = 0
+        for batch in read_batches(reader, batch_size):
+            for line_number, fields in batch:
+                try:
+                    voter = Voter.from_csv_row(fields)
+                except ValueError as e:
+                    rejects.write(line_number, fields, e)
+                    if fields:
+                        keep.add(fields[0].strip())
+                    continue
+
+                if voter.voter_id in seen:
+                    rejects.write(line_number, fields, f'duplicate voter_id {voter.voter_id}')
+                    continue
+                seen.add(voter.voter_id)
+                rows += 1
+
+                if voter.voter_id not in existing:
+                    to_create.append(voter)
+                    continue
+
+                pk, values = existing[voter.voter_id]
+                if tuple(getattr(voter, name) for name in SYNC_FIELDS) != values:
+                    voter.pk = pk
+                    to_update.append(voter)
+
+        to_delete.extend(pk for voter_id, (pk, values) in existing.items()
+                         if voter_id not in seen and voter_id not in keep)
+
+        with transaction.atomic():
+            for start in range(0, len(to_delete), batch_size):
+                Voter.objects.filter(pk__in=to_delete[start:start + batch_size]).delete()
+            Voter.objects.bulk_update(to_update, SYNC_FIELDS, batch_size=batch_size)
+            Voter.objects.bulk_create(to_create, batch_size=batch_size)
+
+        unchanged = rows - len(to_create) - len(to_update)
+        return rows, (f'Created {len(to_create)}, updated {len(to_update)}, deleted {len(to_delete)} '
+                      f'and left {unchanged} voters unchanged')
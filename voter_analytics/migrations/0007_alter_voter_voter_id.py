@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0006_alter_voter_apartment_number'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='voter',
+            name='voter_id',
+            field=models.TextField(db_index=True),
+        ),
+    ]
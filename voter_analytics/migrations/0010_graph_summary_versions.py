@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:34
+
+from django.db import migrations, models
+
+
+def clear_summaries(apps, schema_editor):
+    ''' Drop the summaries stored under the old, unhashed keys.'''
+    apps.get_model('voter_analytics', 'VoterGraphSummary').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0009_votergraphsummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_summaries, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='VoterLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('loaded', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='votergraphsummary',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='votergraphsummary',
+            name='filter_key',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='votergraphsummary',
+            constraint=models.UniqueConstraint(fields=('filter_key', 'data_version'), name='votergraphsummary_unique_key'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0010_graph_summary_versions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='voter',
+            name='street_number',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
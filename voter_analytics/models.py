@@ -2,6 +2,9 @@
 # Author: A'Yanna Rouse (yanni620@bu.edu), 03/31/2025
 # Description: These are for the models for the voter_analytics app.
 
+from datetime import date
+
+from django.core.management import call_command
 from django.db import models
 
 # Create your models here.
@@ -12,7 +15,10 @@ class Voter(models.Model):
     Party Affiliation, Voter Score, V20 State, V21 Town, V21 Primary, V22 General, V23 Town
     '''
 
-    voter_id = models.TextField()
+    # the elections recorded for each voter, in date order
+    ELECTION_FIELDS = ['v20state', 'v21town', 'v21primary', 'v22general', 'v23town']
+
+    voter_id = models.TextField(db_index=True)
     first_name = models.TextField()
     last_name = models.TextField()
     street_name = models.TextField()
@@ -24,7 +30,7 @@ class Voter(models.Model):
 
     party_affiliation = models.CharField(max_length=2)
     
-    street_number = models.IntegerField()
+    street_number = models.IntegerField(null=True, blank=True)
     zip_code = models.IntegerField()
     voter_score = models.IntegerField()
 
@@ -34,59 +40,92 @@ class Voter(models.Model):
     v22general = models.BooleanField()
     v23town = models.BooleanField()
 
+    class Meta:
+        ''' Indexes for the filter combinations submitted by the voter search form.'''
+        indexes = [
+            # party, with or without a birth date range
+            models.Index(fields=['party_affiliation', 'date_of_birth'], name='voter_party_dob_idx'),
+            # voter score, with or without a birth date range
+            models.Index(fields=['voter_score', 'date_of_birth'], name='voter_score_dob_idx'),
+            # birth date range on its own
+            models.Index(fields=['date_of_birth'], name='voter_dob_idx'),
+        ]
 
     def __str__(self):
         '''Return a string representation of this model instance.'''
         return f'{self.first_name} {self.last_name} ({self.street_number}, {self.street_name}, {self.apartment_number},{self.zip_code}), {self.date_of_birth}, {self.party_affiliation}, {self.voter_score}'
     
+    @classmethod
+    def from_csv_row(cls, fields):
+        '''
+        Build an unsaved Voter from one row of the Newton voter CSV file.
+        Every field is converted up front, so a bad row raises ValueError here
+        instead of failing a whole batch at insert time.
+        '''
+
+        if len(fields) < 17:
+            raise ValueError(f'expected 17 fields, found {len(fields)}')
+
+        fields = [field.strip() for field in fields]
+
+        return cls(voter_id=fields[0],
+                   last_name=fields[1],
+                   first_name=fields[2],
+                   street_number=int(fields[3]) if fields[3] else None,
+                   street_name=fields[4],
+                   apartment_number=fields[5] or None,
+                   zip_code=int(fields[6]),
+                   date_of_birth=date.fromisoformat(fields[7]),
+                   date_of_registration=date.fromisoformat(fields[8]),
+                   party_affiliation=fields[9][:2],
+                   precinct=fields[10],
+                   v20state=fields[11].upper() == 'TRUE',
+                   v21town=fields[12].upper() == 'TRUE',
+                   v21primary=fields[13].upper() == 'TRUE',
+                   v22general=fields[14].upper() == 'TRUE',
+                   v23town=fields[15].upper() == 'TRUE',
+                   voter_score=int(fields[16]),
+                  )
+
     def load_data(self):
         ''' Function to load data records from CSV file into Django model instances.'''
 
-        # delete existing records to prevent duplicates:
-        Voter.objects.all().delete()
-        
+        # the bulk loader lives in the load_voters management command
         filename = '/Users/Yanni/Desktop/django/voter_analytics/newton_voters.csv'
-        f = open(filename)
-        f.readline()
-
-        # List to keep track of skipped records
-        skipped_records = []
-
-        for line in f:
-            fields = line.split(',')
-        
-            try:
-                # create a new instance of Voter object with this record from CSV
-                voter = Voter(
-                            last_name=fields[1].strip(),
-                            first_name=fields[2].strip(),
-                            street_number=fields[3] if fields[3].strip() else None,
-                            street_name=fields[4].strip(),
-                            apartment_number=fields[5].strip() if fields[5].strip() else None,
-                            zip_code=fields[6].strip(),
-                            date_of_birth=fields[7].strip(),
-                            date_of_registration=fields[8].strip(),
-                            party_affiliation=fields[9].strip()[:2],
-                            precinct=fields[10].strip(),
-                            v20state=fields[11].strip().upper() == 'TRUE',
-                            v21town=fields[12].strip().upper() == 'TRUE',
-                            v21primary=fields[13].strip().upper() == 'TRUE',
-                            v22general=fields[14].strip().upper() == 'TRUE',
-                            v23town=fields[15].strip().upper() == 'TRUE',
-                            voter_score=fields[16].strip(),
-                )
-            
-                voter.save() # commit to database
-                print(f'Created voter: {voter}')
-                
-            except Exception as e:
-                # Log the skipped record and the error
-                skipped_records.append((fields, str(e)))
-                print(f"Skipped: {fields} - Error: {e}")
-        
-        # Print summary of skipped records
-        print(f"\nSkipped {len(skipped_records)} records:")
-        for record, error in skipped_records:
-            print(f"Record: {record} - Error: {error}")
-        
-        print(f'Done. Created {len(Voter.objects.all())} voters.')
\ No newline at end of file
+        call_command('load_voters', filename)
+
+
+class VoterGraphSummary(models.Model):
+    '''
+    Store the precomputed graphs page series for one combination of search filters,
+    so repeat views do not aggregate the Voter table again.
+    Rows are filled on first request, capped in number, and cleared whenever the voter data is reloaded.
+    '''
+
+    # a hash of the normalized filters, and the VoterLoad the series were computed from
+    filter_key = models.CharField(max_length=64)
+    data_version = models.PositiveIntegerField(default=0)
+    series = models.JSONField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['filter_key', 'data_version'], name='votergraphsummary_unique_key'),
+        ]
+
+    def __str__(self):
+        '''Return a string representation of this model instance.'''
+        return f'Graph summary {self.filter_key} of data version {self.data_version}'
+
+
+class VoterLoad(models.Model):
+    '''
+    Record one import of the voter data. The newest row's pk is the current data version,
+    so graph summaries computed from an earlier load are never served.
+    '''
+
+    loaded = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        '''Return a string representation of this model instance.'''
+        return f'Voter data version {self.pk}, loaded {self.loaded}'
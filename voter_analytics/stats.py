@@ -0,0 +1,105 @@
+# File: stats.py
+# Author: A'Yanna Rouse (yanni620@bu.edu), 10/18/2026
+# Description: Aggregations behind the charts on the voter_analytics graphs page.
+
+import hashlib
+import json
+
+from django.db.models import Count, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Voter, VoterGraphSummary, VoterLoad
+
+# most graph summaries kept; the oldest are dropped to make room for new ones
+MAX_GRAPH_SUMMARIES = 1000
+
+
+def get_graph_series(voters):
+    '''
+    Compute every series shown on the graphs page from a (filtered) Voter queryset.
+    One grouped query counts voters per (birth year, party) together with
+    conditional counts for each election, and the three charts are summed
+    from those groups in Python.
+    '''
+
+    election_counts = {f'{field}_count': Count('id', filter=Q(**{field: True}))
+                       for field in Voter.ELECTION_FIELDS}
+    groups = (voters.order_by()
+                    .values('date_of_birth__year', 'party_affiliation')
+                    .annotate(count=Count('id'), **election_counts))
+
+    birth_years = {}
+    parties = {}
+    elections = dict.fromkeys(Voter.ELECTION_FIELDS, 0)
+    for group in groups:
+        year = group['date_of_birth__year']
+        party = group['party_affiliation']
+        birth_years[year] = birth_years.get(year, 0) + group['count']
+        parties[party] = parties.get(party, 0) + group['count']
+        for field in Voter.ELECTION_FIELDS:
+            elections[field] += group[f'{field}_count']
+
+    return {
+        'birth_years': sorted(birth_years),
+        'birth_year_counts': [birth_years[year] for year in sorted(birth_years)],
+        'parties': sorted(parties),
+        'party_counts': [parties[party] for party in sorted(parties)],
+        'election_counts': [elections[field] for field in Voter.ELECTION_FIELDS],
+    }
+
+
+def make_filter_key(filters):
+    ''' Return a fixed-length key for a normalized filter tuple, however long its values are.'''
+    return hashlib.sha256(json.dumps(filters).encode()).hexdigest()
+
+
+def current_data_version():
+    ''' Return the version of the voter data in the table: the newest VoterLoad's pk, or 0 before any load.'''
+    return VoterLoad.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def get_cached_graph_series(filters, voters):
+    '''
+    Return the graph series for a normalized filter tuple, reading them from the
+    VoterGraphSummary table when present for the current data version, and
+    computing and storing them otherwise.
+    '''
+
+    filter_key = make_filter_key(filters)
+    newest_load = Subquery(VoterLoad.objects.order_by('-pk').values('pk')[:1])
+    summary = (VoterGraphSummary.objects
+               .filter(filter_key=filter_key, data_version=Coalesce(newest_load, Value(0)))
+               .first())
+    if summary is not None:
+        return summary.series
+
+    # read the version before the voters, so series from a load replaced meanwhile are stamped as old
+    data_version = current_data_version()
+    series = get_graph_series(voters)
+
+    # a party longer than the column holds matches nobody, so is not worth a row
+    party = filters[0]
+    if party is None or len(party) <= Voter._meta.get_field('party_affiliation').max_length:
+        store_graph_series(filter_key, data_version, series)
+    return series
+
+
+def store_graph_series(filter_key, data_version, series):
+    ''' Store one summary, first dropping the oldest ones if the table is full.'''
+    count = VoterGraphSummary.objects.count()
+    if count >= MAX_GRAPH_SUMMARIES:
+        oldest = VoterGraphSummary.objects.order_by('created', 'pk').values_list('pk', flat=True)
+        VoterGraphSummary.objects.filter(pk__in=list(oldest[:count - MAX_GRAPH_SUMMARIES + 1])).delete()
+
+    # another request may have stored the same filters in the meantime
+    VoterGraphSummary.objects.bulk_create(
+        [VoterGraphSummary(filter_key=filter_key, data_version=data_version, series=series)],
+        ignore_conflicts=True)
+
+
+def clear_graph_summaries():
+    ''' Start a new data version and discard every stored graph summary; called whenever the Voter table is reloaded.
+    Summaries still being computed from the old data are stored under the old version and never served.
+    '''
+    VoterLoad.objects.create()
+    VoterGraphSummary.objects.all().delete()
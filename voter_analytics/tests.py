@@ -1,3 +1,261 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import tempfile
+from datetime import date
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Voter, VoterGraphSummary, VoterLoad
+from .stats import clear_graph_summaries, get_cached_graph_series, get_graph_series
+from .views import VoterListView
+
+
+def make_voter(voter_id, party='D', dob=date(1950, 1, 1), score=0, **elections):
+    ''' Create and return a Voter with placeholder address fields.'''
+    votes = {field: elections.get(field, False) for field in Voter.ELECTION_FIELDS}
+    return Voter.objects.create(voter_id=str(voter_id), first_name='First', last_name='Last', street_name='Main St',
+                                precinct='1', street_number=1, zip_code=2459, date_of_birth=dob,
+                                date_of_registration=date(2010, 1, 1), party_affiliation=party,
+                                voter_score=score, **votes)
 
 # Create your tests here.
+class VoterFilterIndexTests(TestCase):
+    ''' Check that the common search form filters are answered from an index.'''
+
+    def filtered_queryset(self, **params):
+        ''' Return the queryset VoterListView builds for these GET parameters.'''
+        view = VoterListView()
+        view.setup(RequestFactory().get('/voter_analytics/voter', params))
+        return view.get_queryset()
+
+    def assertUsesIndex(self, **params):
+        ''' Assert the query plan for these filters searches an index instead of scanning the table.'''
+        plan = self.filtered_queryset(**params).explain()
+        self.assertIn('USING INDEX', plan)
+        self.assertNotIn('SCAN voter_analytics_voter', plan)
+
+    def test_party_filter(self):
+        self.assertUsesIndex(party_affiliation='D')
+
+    def test_party_and_birth_year_filter(self):
+        self.assertUsesIndex(party_affiliation='D', min_dob='1950', max_dob='1980', v20state='on')
+
+    def test_birth_year_filter(self):
+        self.assertUsesIndex(min_dob='1950', max_dob='1980')
+
+    def test_out_of_range_years_are_ignored(self):
+        make_voter(1)
+        for params in [{'min_dob': '0'}, {'max_dob': '9999'}, {'min_dob': '99999'}, {'max_dob': '²'}]:
+            self.assertEqual(self.filtered_queryset(**params).count(), 1, params)
+            self.assertEqual(self.client.get(reverse('voters_list'), params).status_code, 200, params)
+
+    def test_score_filter(self):
+        self.assertUsesIndex(voter_score='3', v22general='on')
+
+    def test_birth_year_range_is_inclusive(self):
+        ''' The date range must match the years the old __year filter matched.'''
+        sql = str(self.filtered_queryset(min_dob='1950', max_dob='1980').query)
+        self.assertIn('1950-01-01', sql)
+        self.assertIn('1981-01-01', sql)
+
+
+class VoterGraphsTests(TestCase):
+    ''' Check the graphs page aggregates its charts in a single query.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        rows = [
+            ('D', date(1950, 3, 1), 5, True, False),
+            ('D', date(1950, 7, 9), 2, False, False),
+            ('R', date(1961, 1, 1), 4, True, True),
+            ('U', date(1975, 12, 31), 0, False, True),
+        ]
+        for i, (party, dob, score, v20state, v23town) in enumerate(rows):
+            make_voter(i, party, dob, score, v20state=v20state, v23town=v23town)
+
+    def test_graph_series(self):
+        series = get_graph_series(Voter.objects.all())
+        self.assertEqual(series['birth_years'], [1950, 1961, 1975])
+        self.assertEqual(series['birth_year_counts'], [2, 1, 1])
+        self.assertEqual(series['parties'], ['D', 'R', 'U'])
+        self.assertEqual(series['party_counts'], [2, 1, 1])
+        self.assertEqual(series['election_counts'], [2, 0, 0, 0, 2])
+
+    def test_graphs_page_query_count(self):
+        filters = {'party_affiliation': 'D', 'min_dob': '1940'}
+
+        # summary lookup, data version, the single aggregate query, the size check and storing the summary
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('graphs'), filters)
+        self.assertEqual(response.status_code, 200)
+
+        # a repeat view is answered from the summary table alone
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('graphs'), filters)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"voter_analytics_voter"', queries[0]['sql'])
+
+    def test_import_clears_summaries(self):
+        self.client.get(reverse('graphs'))
+        self.assertEqual(VoterGraphSummary.objects.count(), 1)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('header\n')
+            f.write('10,Smith,Jo,12,Elm St,,2459,1980-02-02,2012-05-05,R ,3,TRUE,TRUE,FALSE,FALSE,TRUE,3\n')
+        self.addCleanup(os.remove, f.name)
+        call_command('load_voters', f.name, '--sync', stdout=io.StringIO())
+
+        self.assertEqual(VoterGraphSummary.objects.count(), 0)
+        self.assertEqual(list(Voter.objects.values_list('voter_id', flat=True)), ['10'])
+
+    def test_free_text_party_is_not_stored(self):
+        response = self.client.get(reverse('graphs'), {'party_affiliation': 'x' * 500})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(VoterGraphSummary.objects.exists())
+
+        self.client.get(reverse('graphs'), {'party_affiliation': 'D'})
+        self.assertEqual(len(VoterGraphSummary.objects.get().filter_key), 64)
+
+    def test_summaries_are_capped(self):
+        with mock.patch('voter_analytics.stats.MAX_GRAPH_SUMMARIES', 3):
+            for score in range(5):
+                self.client.get(reverse('graphs'), {'voter_score': score})
+        self.assertEqual(VoterGraphSummary.objects.count(), 3)
+
+    def test_summary_from_an_older_load_is_ignored(self):
+        filters = (None, None, None, None, ())
+        old_series = get_graph_series(Voter.objects.none())
+
+        # a request reads the data version, then the import replaces the table before it stores its series
+        with mock.patch('voter_analytics.stats.get_graph_series',
+                        side_effect=lambda voters: (clear_graph_summaries(), old_series)[1]):
+            get_cached_graph_series(filters, Voter.objects.all())
+        # stored under the version from before the load, which is no longer current
+        self.assertEqual(VoterGraphSummary.objects.get().data_version, 0)
+        self.assertTrue(VoterLoad.objects.exists())
+
+        series = get_cached_graph_series(filters, Voter.objects.all())
+        self.assertEqual(series['party_counts'], [2, 1, 1])
+
+
+class VoterPaginationTests(TestCase):
+    ''' Check the voter list pages through results with cursors instead of OFFSET.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.voters = [make_voter(i) for i in range(5)]
+
+    def get_page(self, query=''):
+        ''' Return the voters and page object shown for a query string, checking the SQL as we go.'''
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('voters_list') + '?' + query)
+        for query in queries:
+            self.assertNotIn('OFFSET', query['sql'])
+            self.assertNotIn('COUNT(', query['sql'])
+        return list(response.context['voters']), response.context['page_obj']
+
+    @mock.patch.object(VoterListView, 'paginate_by', 2)
+    def test_next_and_previous_cursors(self):
+        voters, page = self.get_page()
+        self.assertEqual(voters, self.voters[:2])
+        self.assertFalse(page.has_previous())
+
+        voters, page = self.get_page(page.next_query)
+        self.assertEqual(voters, self.voters[2:4])
+        self.assertEqual(page.number, 2)
+
+        voters, page = self.get_page(page.next_query)
+        self.assertEqual(voters, self.voters[4:])
+        self.assertFalse(page.has_next())
+
+        voters, page = self.get_page(page.previous_query)
+        self.assertEqual(voters, self.voters[2:4])
+
+    def test_tampered_cursor_shows_first_page(self):
+        voters, page = self.get_page('cursor=not-a-cursor')
+        self.assertEqual(page.number, 1)
+        self.assertEqual(voters, self.voters)
+
+
+def voter_row(voter_id, street_number='12', party='R ', score='3'):
+    ''' Return one row of the voter file.'''
+    return [voter_id, 'Smith', 'Jo', street_number, 'Elm St', '', '2459', '1980-02-02', '2012-05-05',
+            party, '3', 'TRUE', 'TRUE', 'FALSE', 'FALSE', 'TRUE', score]
+
+
+class VoterLoadTests(TestCase):
+    ''' Check load_voters replaces the table, or syncs it, and reports the rows it skipped.'''
+
+    def setUp(self):
+        make_voter('1', party='D')
+        make_voter('2', party='D')
+
+    def load(self, rows, *args):
+        ''' Run load_voters on a file of rows; return the rows of its rejects file.'''
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='') as f:
+            f.write('header\n')
+            csv.writer(f).writerows(rows)
+        rejects = f.name + '.rejects.csv'
+        self.addCleanup(os.remove, f.name)
+        call_command('load_voters', f.name, '--batch-size', '2', *args, stdout=io.StringIO())
+        if not os.path.exists(rejects):
+            return []
+        self.addCleanup(os.remove, rejects)
+        with open(rejects, newline='') as f:
+            return list(csv.reader(f))
+
+    def test_full_load_replaces_the_table(self):
+        rejected = self.load([voter_row('10'), voter_row('11', street_number=''), voter_row('12'),
+                              voter_row('13', score='high'), voter_row('14')])
+
+        voters = dict(Voter.objects.values_list('voter_id', 'street_number'))
+        self.assertEqual(voters, {'10': 12, '11': None, '12': 12, '14': 12})
+
+        self.assertEqual(len(rejected), 2)
+        self.assertEqual(rejected[0], ['line', 'error', 'fields'])
+        line, error, *fields = rejected[1]
+        self.assertEqual(line, '5')
+        self.assertIn("'high'", error)
+        self.assertEqual(fields, voter_row('13', score='high'))
+
+    def test_clean_load_writes_no_rejects_file(self):
+        self.assertEqual(self.load([voter_row('10')]), [])
+
+    def test_failed_full_load_keeps_the_old_table(self):
+        with mock.patch.object(Voter, 'from_csv_row', side_effect=[Voter(voter_id='10'), RuntimeError('interrupted')]):
+            with self.assertRaises(RuntimeError):
+                self.load([voter_row('10'), voter_row('11'), voter_row('12')])
+        self.assertEqual(sorted(Voter.objects.values_list('voter_id', flat=True)), ['1', '2'])
+
+    def test_sync_inserts_new_voters(self):
+        rejected = self.load([voter_row('1', party='D '), voter_row('2', party='D '), voter_row('3')], '--sync')
+        self.assertEqual(rejected, [])
+        self.assertEqual(Voter.objects.count(), 3)
+        self.assertEqual(Voter.objects.get(voter_id='3').party_affiliation, 'R')
+
+    def test_sync_updates_changed_voters_in_place(self):
+        pks = dict(Voter.objects.values_list('voter_id', 'pk'))
+        self.load([voter_row('1', party='D '), voter_row('2', party='D ')], '--sync')
+        self.load([voter_row('1', party='D '), voter_row('2', party='R ')], '--sync')
+
+        self.assertEqual(dict(Voter.objects.values_list('voter_id', 'pk')), pks)
+        self.assertEqual(dict(Voter.objects.values_list('voter_id', 'party_affiliation')), {'1': 'D', '2': 'R'})
+
+    def test_sync_deletes_missing_voters(self):
+        self.load([voter_row('2', party='D ')], '--sync')
+        self.assertEqual(list(Voter.objects.values_list('voter_id', flat=True)), ['2'])
+
+    def test_sync_rejects_bad_and_duplicate_rows(self):
+        rejected = self.load([voter_row('1'), voter_row('2', score=''), voter_row('1', party='D ')], '--sync')
+
+        # voter 2's row is rejected, so voter 2 is kept as it was rather than deleted
+        self.assertEqual(dict(Voter.objects.values_list('voter_id', 'party_affiliation')), {'1': 'R', '2': 'D'})
+        self.assertEqual([row[:2] for row in rejected[1:]],
+                         [['3', "invalid literal for int() with base 10: ''"], ['4', 'duplicate voter_id 1']])
+        self.assertEqual(rejected[2][2:], voter_row('1', party='D '))
@@ -3,61 +3,94 @@
 # Description: These are for the views for the voter_analytics app, to show the voters information.
 
 # Create your views here.
+from datetime import date
 from django.db.models.query import QuerySet #type: ignore
 from django.shortcuts import render #type: ignore
 from django.views.generic import ListView, DetailView #type: ignore
-from django.db.models import Count
+from cs412.pagination import KeysetPaginationMixin
 from . models import Voter
-import plotly.io #type: ignore
-import plotly.graph_objs as go #type: ignore
+from .stats import get_cached_graph_series
 
+# birth years the filters accept; the search adds one to the maximum, and dates stop at 9999
+MIN_FILTER_YEAR = 1
+MAX_FILTER_YEAR = 9998
 
-class VoterListView(ListView):
-    '''View to display marathon results'''
 
-    template_name = 'voter_analytics/voters.html'
-    model = Voter
-    context_object_name = 'voters'
-    paginate_by = 100
+def read_number(value, low=None, high=None):
+    ''' Return value as an integer, or None if it is blank, not plain digits, or outside low..high.'''
+    if not (value.isascii() and value.isdigit()):
+        return None
+    number = int(value)
+    if (low is not None and number < low) or (high is not None and number > high):
+        return None
+    return number
+
+
+class VoterFilterMixin:
+    ''' Filter the Voter queryset by the fields submitted in the search form.'''
+
+    # Election participation filters (checkboxes)
+    election_fields = Voter.ELECTION_FIELDS
+
+    def get_filters(self):
+        '''
+        Return the submitted filters as a normalized tuple:
+        (party, min birth year, max birth year, voter score, checked elections).
+        Blank, malformed or out-of-range values become None.
+        '''
+        request = self.request
+
+        # Get filter params
+        party = request.GET.get('party_affiliation', '').strip()
+        min_dob = request.GET.get('min_dob', '')
+        max_dob = request.GET.get('max_dob', '')
+        score = request.GET.get('voter_score', '')
+
+        return (party or None,
+                read_number(min_dob, MIN_FILTER_YEAR, MAX_FILTER_YEAR),
+                read_number(max_dob, MIN_FILTER_YEAR, MAX_FILTER_YEAR),
+                read_number(score),
+                tuple(field for field in self.election_fields if request.GET.get(field) == 'on'))
 
     def get_queryset(self):
         ''' Get the list of voters and filter by party affiliation, date of birth, and voter score'''
 
         # start with entire queryset
         qs = super().get_queryset()
-        request = self.request
-
-        # Get filter params
-        party = request.GET.get('party_affiliation')
-        min_dob = request.GET.get('min_dob')
-        max_dob = request.GET.get('max_dob')
-        score = request.GET.get('voter_score')
+        party, min_year, max_year, score, elections = self.get_filters()
 
         # Filter by party affiliation, date of birth, and voter score
 
         # Party affiliation filter
         if party:
-            qs = qs.filter(party_affiliation=party.strip())
+            qs = qs.filter(party_affiliation=party)
 
-        # Date of birth filter
-        if min_dob:
-            qs = qs.filter(date_of_birth__year__gte=min_dob)
+        # Date of birth filter, as a date range rather than a __year lookup so it can use an index
+        if min_year is not None:
+            qs = qs.filter(date_of_birth__gte=date(min_year, 1, 1))
 
-        if max_dob:
-            qs = qs.filter(date_of_birth__year__lte=max_dob)
+        if max_year is not None:
+            qs = qs.filter(date_of_birth__lt=date(max_year + 1, 1, 1))
 
         # Voter score filter
-        if score:
+        if score is not None:
             qs = qs.filter(voter_score=score)
 
         # Election participation filters (checkboxes)
-        election_fields = ['v20state', 'v21town', 'v21primary', 'v22general', 'v23town']
-        for field in election_fields:
-            if request.GET.get(field) == 'on':  # Checkbox is checked
-                qs = qs.filter(**{field: True})
+        for field in elections:
+            qs = qs.filter(**{field: True})
 
         return qs
-        
+
+class VoterListView(VoterFilterMixin, KeysetPaginationMixin, ListView):
+    '''View to display marathon results'''
+
+    template_name = 'voter_analytics/voters.html'
+    model = Voter
+    context_object_name = 'voters'
+    paginate_by = 100
+    keyset_fields = ('pk',)
+
     def get_context_data(self, **kwargs):
         '''Add additional data to the context'''
 
@@ -76,86 +109,44 @@ class VoterDetailView(DetailView):
     context_object_name = "v" 
     template_name = 'voter_analytics/voters_detail.html'
 
-class VoterGraphsView(ListView):
+class VoterGraphsView(VoterFilterMixin, ListView):
     ''' View to display graphs of voter data'''
 
     model = Voter
     template_name = 'voter_analytics/graphs.html'
     context_object_name = 'v'
 
-    def get_queryset(self):
-        ''' Get the list of voters and filter by party affiliation, date of birth, and voter score'''
-
-        # start with entire queryset
-        qs = super().get_queryset()
-        request = self.request
-
-        # Get filter params
-        party = request.GET.get('party_affiliation')
-        min_dob = request.GET.get('min_dob')
-        max_dob = request.GET.get('max_dob')
-        score = request.GET.get('voter_score')
-
-        # Filter by party affiliation, date of birth, and voter score
-
-        # Party affiliation filter
-        if party:
-            qs = qs.filter(party_affiliation=party.strip())
-
-        # Date of birth filter
-        if min_dob:
-            qs = qs.filter(date_of_birth__year__gte=min_dob)
-
-        if max_dob:
-            qs = qs.filter(date_of_birth__year__lte=max_dob)
-
-        # Voter score filter
-        if score:
-            qs = qs.filter(voter_score=score)
-
-        # Election participation filters (checkboxes)
-        election_fields = ['v20state', 'v21town', 'v21primary', 'v22general', 'v23town']
-        for field in election_fields:
-            if request.GET.get(field) == 'on':  # Checkbox is checked
-                qs = qs.filter(**{field: True})
-
-        return qs
-
     def get_context_data(self, **kwargs):
         '''Add graph data to the context'''
 
+        # plotly is slow to import, so only load it once a graph is actually drawn
+        import plotly.io #type: ignore
+        import plotly.graph_objs as go #type: ignore
+
         # Call the base implementation first to get a context
         context = super().get_context_data(**kwargs)
 
-        # Aggregate data for the graphs
-        voters = self.get_queryset()
+        # Aggregate data for the graphs, reusing the queryset ListView.get() already built;
+        # repeat views of the same filters are served from the summary table
+        series = get_cached_graph_series(self.get_filters(), self.object_list)
 
         # For the form section
         context['years'] = range(1920, 2005)
         context['scores'] = [0, 1, 2, 3, 4, 5]
 
         # Histogram: Distribution of Voters by Year of Birth
-        birth_year_counts = voters.values('date_of_birth__year').annotate(count=Count('id')).order_by('date_of_birth__year')
-        birth_years = [entry['date_of_birth__year'] for entry in birth_year_counts]
-        birth_year_values = [entry['count'] for entry in birth_year_counts]
-        birth_year_fig = go.Figure(data=[go.Bar(x=birth_years, y=birth_year_values)])
+        birth_year_fig = go.Figure(data=[go.Bar(x=series['birth_years'], y=series['birth_year_counts'])])
         birth_year_fig.update_layout(title='Voter Distribution by Year of Birth', xaxis_title='Year of Birth', yaxis_title='Count')
         context['birth_year_graph'] = plotly.io.to_html(birth_year_fig, full_html=False)
 
         # Pie Chart: Distribution of Voters by Party Affiliation
-        party_counts = voters.values('party_affiliation').annotate(count=Count('id'))
-        party_labels = [entry['party_affiliation'] for entry in party_counts]
-        party_values = [entry['count'] for entry in party_counts]
-        party_fig = go.Figure(data=[go.Pie(labels=party_labels, values=party_values)])
+        party_fig = go.Figure(data=[go.Pie(labels=series['parties'], values=series['party_counts'])])
         party_fig.update_layout(title='Voter Distribution by Party Affiliation')
         context['party_graph'] = plotly.io.to_html(party_fig, full_html=False)
 
         # Histogram: Distribution of Voters by Participation in Elections
-        election_fields = ['v20state', 'v21town', 'v21primary', 'v22general', 'v23town']
-        election_counts = {field: voters.filter(**{field: True}).count() for field in election_fields}
         election_labels = ['2020 State', '2021 Town', '2021 Primary', '2022 General', '2023 Town']
-        election_values = [election_counts[field] for field in election_fields]
-        election_fig = go.Figure(data=[go.Bar(x=election_labels, y=election_values)])
+        election_fig = go.Figure(data=[go.Bar(x=election_labels, y=series['election_counts'])])
         election_fig.update_layout(title='Voter Participation by Election', xaxis_title='Election', yaxis_title='Count')
         context['election_graph'] = plotly.io.to_html(election_fig, full_html=False)
 